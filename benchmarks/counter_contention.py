@@ -0,0 +1,287 @@
+"""
+Contention benchmark for participant counters in dynamodb_service.
+
+Runs concurrent registrations for a single event against a local in-memory
+stand-in for DynamoDB, once with the single-item counter and once with the
+sharded counter, and reports throughput and the final participant count.
+
+The stand-in serialises writes per item and charges a fixed latency for each
+write, which approximates the per-item write ceiling of a hot partition.
+
+Usage:
+    python benchmarks/counter_contention.py [--registrations 200] [--workers 32] [--shards 8]
+"""
+import os
+import sys
+import time
+import types
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from services import dynamodb_service  # noqa: E402
+
+TABLE_NAME = 'calendar-events-bench'
+PARTICIPANTS_TABLE_NAME = 'calendar-participants-bench'
+EVENT_ID = 'bench-event_20250114'
+
+
+class LocalTable:
+    """In-memory stand-in for a DynamoDB table with per-item write serialisation."""
+
+    def __init__(self, name, key_names, write_latency):
+        self.name = name
+        self.key_names = key_names
+        self.write_latency = write_latency
+        self.items = {}
+        self._item_locks = {}
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        return tuple(key[name] for name in self.key_names)
+
+    def _item_lock(self, key):
+        with self._lock:
+            return self._item_locks.setdefault(key, threading.Lock())
+
+    def _project(self, item, projection):
+        if not projection:
+            return dict(item)
+        attributes = [name.strip() for name in projection.split(',')]
+        return {name: item[name] for name in attributes if name in item}
+
+    def _check(self, item, condition, values, operation):
+        if condition and not _evaluate_condition(item, condition, values):
+            raise ClientError(
+                {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'condition failed'}},
+                operation
+            )
+
+    def get_item(self, Key, ProjectionExpression=None, **kwargs):
+        item = self.items.get(self._key(Key))
+        return {'Item': self._project(item, ProjectionExpression)} if item else {}
+
+    def put_item(self, Item, ConditionExpression=None, **kwargs):
+        key = self._key(Item)
+        with self._item_lock(key):
+            time.sleep(self.write_latency)
+            self._check(self.items.get(key, {}), ConditionExpression, {}, 'PutItem')
+            self.items[key] = dict(Item)
+        return {}
+
+    def delete_item(self, Key, **kwargs):
+        key = self._key(Key)
+        with self._item_lock(key):
+            time.sleep(self.write_latency)
+            self.items.pop(key, None)
+        return {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues,
+                    ConditionExpression=None, ReturnValues=None, **kwargs):
+        key = self._key(Key)
+        values = ExpressionAttributeValues
+        with self._item_lock(key):
+            time.sleep(self.write_latency)
+            item = dict(self.items.get(key) or Key)
+            self._check(item, ConditionExpression, values, 'UpdateItem')
+            updated = _apply_update(item, UpdateExpression, values)
+            self.items[key] = item
+        return {'Attributes': updated} if ReturnValues == 'UPDATED_NEW' else {}
+
+
+class LocalClient:
+    """In-memory stand-in for the low-level client (resource.meta.client)."""
+
+    def __init__(self, tables, write_latency):
+        self.tables = tables
+        self.write_latency = write_latency
+
+    def transact_write_items(self, TransactItems):
+        deserializer = TypeDeserializer()
+
+        def plain(values):
+            return {name: deserializer.deserialize(value) for name, value in (values or {}).items()}
+
+        operations = []
+        for transact_item in TransactItems:
+            (kind, request), = transact_item.items()
+            table = self.tables[request['TableName']]
+            key = table._key(plain(request.get('Key') or request.get('Item')))
+            operations.append((kind, request, table, key))
+
+        # Lock every item in a fixed order, like DynamoDB serialises conflicting transactions
+        locks = [table._item_lock(key) for _, _, table, key in
+                 sorted(operations, key=lambda operation: (operation[2].name, operation[3]))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            time.sleep(self.write_latency)
+            reasons = []
+            for kind, request, table, key in operations:
+                condition = request.get('ConditionExpression')
+                item = table.items.get(key, {})
+                passed = not condition or _evaluate_condition(
+                    item, condition, plain(request.get('ExpressionAttributeValues'))
+                )
+                reasons.append({'Code': 'None' if passed else 'ConditionalCheckFailed'})
+            if any(reason['Code'] != 'None' for reason in reasons):
+                raise ClientError(
+                    {'Error': {'Code': 'TransactionCanceledException', 'Message': 'transaction cancelled'},
+                     'CancellationReasons': reasons},
+                    'TransactWriteItems'
+                )
+            for kind, request, table, key in operations:
+                if kind == 'Put':
+                    table.items[key] = plain(request['Item'])
+                elif kind == 'Update':
+                    item = dict(table.items.get(key) or plain(request['Key']))
+                    _apply_update(item, request['UpdateExpression'], plain(request['ExpressionAttributeValues']))
+                    table.items[key] = item
+        finally:
+            for lock in locks:
+                lock.release()
+        return {}
+
+
+class LocalDynamoDB:
+    """In-memory stand-in for the boto3 DynamoDB service resource."""
+
+    def __init__(self, write_latency):
+        self.tables = {
+            TABLE_NAME: LocalTable(TABLE_NAME, ('event_id',), write_latency),
+            PARTICIPANTS_TABLE_NAME: LocalTable(
+                PARTICIPANTS_TABLE_NAME, ('event_id', 'participant_email'), write_latency
+            )
+        }
+        self.meta = types.SimpleNamespace(client=LocalClient(self.tables, write_latency))
+
+    def Table(self, name):
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self.tables[table_name]
+            responses[table_name] = [
+                item['Item'] for item in (
+                    table.get_item(Key=key, ProjectionExpression=request.get('ProjectionExpression'))
+                    for key in request['Keys']
+                ) if item
+            ]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+
+def _apply_update(item, expression, values):
+    """Apply the UpdateExpressions used by dynamodb_service to an item."""
+    updated = {}
+    for action, body in _split_update_expression(expression):
+        for clause in _split_clauses(body):
+            if action == 'SET':
+                name, value = (part.strip() for part in clause.split('=', 1))
+                if value.startswith('if_not_exists('):
+                    _, default = value[len('if_not_exists('):-1].split(',')
+                    updated[name] = item.get(name, values[default.strip()])
+                else:
+                    updated[name] = values[value]
+            elif action == 'ADD':
+                name, value = clause.split()
+                updated[name] = item.get(name, 0) + values[value]
+            elif action == 'REMOVE':
+                item.pop(clause, None)
+    item.update(updated)
+    return updated
+
+
+def _split_update_expression(expression):
+    """Split an UpdateExpression into (action, clauses) pairs."""
+    actions = ('SET', 'ADD', 'REMOVE')
+    parts = []
+    for token in expression.split():
+        if token in actions:
+            parts.append([token, []])
+        else:
+            parts[-1][1].append(token)
+    return [(action, ' '.join(tokens)) for action, tokens in parts]
+
+
+def _split_clauses(body):
+    """Split comma separated clauses, ignoring commas inside function calls."""
+    clauses, depth, current = [], 0, ''
+    for char in body:
+        depth += (char == '(') - (char == ')')
+        if char == ',' and depth == 0:
+            clauses.append(current.strip())
+            current = ''
+        else:
+            current += char
+    return clauses + [current.strip()] if current.strip() else clauses
+
+
+def _evaluate_condition(item, condition, values):
+    """Evaluate the condition expressions used by dynamodb_service."""
+    for alternative in condition.split(' OR '):
+        alternative = alternative.strip()
+        if alternative.startswith('attribute_not_exists('):
+            if alternative[len('attribute_not_exists('):-1] not in item:
+                return True
+        elif alternative.startswith('NOT contains('):
+            name, value = alternative[len('NOT contains('):-1].split(',')
+            if values[value.strip()] not in item.get(name.strip(), []):
+                return True
+        elif ' < ' in alternative:
+            name, value = (part.strip() for part in alternative.split(' < '))
+            if name in item and item[name] < values[value]:
+                return True
+        else:
+            raise ValueError(f'Unsupported condition: {alternative}')
+    return False
+
+
+def run(registrations, workers, shards, write_latency):
+    """Run one benchmark round and return (elapsed seconds, final count)."""
+    local_dynamodb = LocalDynamoDB(write_latency)
+    dynamodb_service.get_dynamodb_resource = lambda: local_dynamodb
+    os.environ['DYNAMODB_TABLE_NAME'] = TABLE_NAME
+    os.environ['PARTICIPANTS_TABLE_NAME'] = PARTICIPANTS_TABLE_NAME
+    os.environ['DYNAMODB_COUNTER_SHARDS'] = f'{{"default": {shards}}}'
+
+    def register(index):
+        dynamodb_service.update_event_participants(
+            EVENT_ID, 'Benchmark workshop', '2025-01-14T10:00:00', '2025-01-14T12:00:00',
+            f'participant{index}@example.com'
+        )
+
+    # Silence per-registration logging from the service
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(register, range(registrations)))
+        elapsed = time.perf_counter() - started
+        count = dynamodb_service.get_attendee_count(EVENT_ID)
+
+    return elapsed, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--registrations', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--shards', type=int, default=8)
+    parser.add_argument('--write-latency', type=float, default=0.005,
+                        help='Simulated per-item write latency in seconds')
+    args = parser.parse_args()
+
+    for label, shards in (('single item', 1), (f'{args.shards} shards', args.shards)):
+        elapsed, count = run(args.registrations, args.workers, shards, args.write_latency)
+        print(f'{label:>12}: {args.registrations / elapsed:8.1f} registrations/s, '
+              f'final count {count}/{args.registrations}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Differential check and benchmark for services.recurrence_service.
+
+Generates random calendar feeds made of the rules used in our Google feed
+(FREQ=DAILY/WEEKLY with INTERVAL, BYDAY, COUNT, UNTIL and EXDATE) mixed with
+series that need the recurring_ical_events fallback (modified occurrences,
+RDATE, monthly rules), half of them with an X-WR-TIMEZONE, and checks that expand_events() returns exactly the
+same occurrences as recurring_ical_events for random query ranges.
+
+Usage:
+    python benchmarks/rrule_differential.py [--feeds 200] [--events 40] [--seed 1]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+import recurring_ical_events
+from icalendar import Calendar
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from services.recurrence_service import expand_events  # noqa: E402
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+TIMEZONES = ['Europe/Warsaw', 'America/New_York', 'UTC']
+
+
+def random_start(rng):
+    """Random DTSTART value as (kind, tzid, naive datetime)."""
+    day = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randrange(800))
+    kind = rng.choice(['zoned', 'zoned', 'utc', 'floating', 'date'])
+    if kind == 'date':
+        return kind, None, datetime.datetime.combine(day, datetime.time.min)
+    moment = datetime.datetime.combine(day, datetime.time(rng.randrange(24), rng.choice([0, 15, 30])))
+    return kind, rng.choice(TIMEZONES) if kind == 'zoned' else None, moment
+
+
+def format_value(kind, tzid, moment, name):
+    """Format a date/datetime property line."""
+    if kind == 'date':
+        return f'{name};VALUE=DATE:{moment:%Y%m%d}'
+    if kind == 'utc':
+        return f'{name}:{moment:%Y%m%dT%H%M%S}Z'
+    if kind == 'zoned':
+        return f'{name};TZID={tzid}:{moment:%Y%m%dT%H%M%S}'
+    return f'{name}:{moment:%Y%m%dT%H%M%S}'
+
+
+def random_rule(rng, kind, start):
+    """Random RRULE line, mostly of the supported kind."""
+    frequency = rng.choices(['WEEKLY', 'DAILY', 'MONTHLY'], weights=[6, 3, 1])[0]
+    parts = [f'FREQ={frequency}']
+    if rng.random() < 0.4:
+        parts.append(f'INTERVAL={rng.randint(1, 4)}')
+    if frequency == 'WEEKLY' and rng.random() < 0.7:
+        parts.append('BYDAY=' + ','.join(rng.sample(WEEKDAYS, rng.randint(1, 4))))
+    if frequency == 'WEEKLY' and rng.random() < 0.2:
+        parts.append(f'WKST={rng.choice(WEEKDAYS)}')
+    limit = rng.random()
+    if limit < 0.35:
+        parts.append(f'COUNT={rng.randint(1, 30)}')
+    elif limit < 0.7:
+        until = start + datetime.timedelta(days=rng.randint(0, 200), hours=rng.randint(0, 23))
+        if kind == 'date' and rng.random() < 0.7:
+            parts.append(f'UNTIL={until:%Y%m%d}')
+        elif kind == 'floating' and rng.random() < 0.5:
+            parts.append(f'UNTIL={until:%Y%m%dT%H%M%S}')
+        else:
+            parts.append(f'UNTIL={until:%Y%m%dT%H%M%S}Z')
+    return 'RRULE:' + ';'.join(parts)
+
+
+def random_event(rng, index):
+    """Random VEVENT lines, possibly with a modified occurrence."""
+    kind, tzid, start = random_start(rng)
+    if kind == 'date':
+        end = start + datetime.timedelta(days=rng.randint(1, 3))
+    else:
+        end = start + datetime.timedelta(minutes=rng.choice([0, 30, 60, 90, 180, 1500]))
+    uid = f'event-{index}@example.com'
+    lines = ['BEGIN:VEVENT', f'UID:{uid}', f'SUMMARY:Event {index}',
+             format_value(kind, tzid, start, 'DTSTART'), format_value(kind, tzid, end, 'DTEND')]
+    if rng.random() < 0.85:
+        lines.append(random_rule(rng, kind, start))
+        for _ in range(rng.randint(0, 3)):
+            offset = datetime.timedelta(days=rng.choice([1, 7, 14, 21, 28, 35]) * rng.randint(0, 4))
+            lines.append(format_value(kind, tzid, start + offset, 'EXDATE'))
+        if rng.random() < 0.05:
+            lines.append(format_value(kind, tzid, start + datetime.timedelta(days=3), 'RDATE'))
+    if rng.random() < 0.1:
+        lines.append(f'SEQUENCE:{rng.randint(0, 3)}')
+    lines.append('END:VEVENT')
+
+    if rng.random() < 0.05 and kind != 'date':
+        # A moved occurrence of the series
+        moved = start + datetime.timedelta(days=7)
+        lines += ['BEGIN:VEVENT', f'UID:{uid}', f'SUMMARY:Event {index} (moved)',
+                  format_value(kind, tzid, moved, 'RECURRENCE-ID'),
+                  format_value(kind, tzid, moved + datetime.timedelta(hours=2), 'DTSTART'),
+                  format_value(kind, tzid, moved + datetime.timedelta(hours=3), 'DTEND'),
+                  'END:VEVENT']
+    return lines
+
+
+def random_calendar(rng, events):
+    """Random calendar feed with the given number of series."""
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Differential check//EN']
+    if rng.random() < 0.5:
+        # Google feeds name the calendar's zone and give times in UTC
+        lines.append(f'X-WR-TIMEZONE:{rng.choice(TIMEZONES)}')
+    for index in range(events):
+        lines += random_event(rng, index)
+    lines.append('END:VCALENDAR')
+    return Calendar.from_ical('\r\n'.join(lines))
+
+
+def random_span(rng):
+    """Random query range like the ones used by the request handlers."""
+    day = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randrange(900))
+    if rng.random() < 0.5:
+        # find_event_by_id: a single day
+        return (datetime.datetime.combine(day, datetime.time.min),
+                datetime.datetime.combine(day, datetime.time.max))
+    # get_time_range_for_date: 90 days ahead
+    return (datetime.datetime.combine(day, datetime.time.min),
+            datetime.datetime.combine(day + datetime.timedelta(days=90), datetime.time.max))
+
+
+def occurrence_keys(components):
+    """Comparable representation of a list of occurrence components."""
+    return [component.to_ical() for component in components]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--feeds', type=int, default=200)
+    parser.add_argument('--events', type=int, default=40)
+    parser.add_argument('--spans', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    library_time = expander_time = 0.0
+    checked = mismatches = occurrences = 0
+    for feed in range(args.feeds):
+        calendar = random_calendar(rng, args.events)
+        for _ in range(args.spans):
+            span_start, span_end = random_span(rng)
+
+            started = time.perf_counter()
+            expected = list(recurring_ical_events.of(calendar).between(span_start, span_end))
+            library_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            actual = expand_events(calendar, span_start, span_end)
+            expander_time += time.perf_counter() - started
+
+            checked += 1
+            occurrences += len(expected)
+            if occurrence_keys(expected) != occurrence_keys(actual):
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f'Mismatch in feed {feed} for {span_start} - {span_end}')
+                    expected_keys, actual_keys = set(occurrence_keys(expected)), set(occurrence_keys(actual))
+                    for key in expected_keys - actual_keys:
+                        print('  missing:\n' + key.decode())
+                    for key in actual_keys - expected_keys:
+                        print('  unexpected:\n' + key.decode())
+
+    print(f'{checked} queries checked ({occurrences} occurrences), {mismatches} mismatches')
+    print(f'recurring_ical_events: {library_time:.2f}s, expand_events: {expander_time:.2f}s '
+          f'({library_time / expander_time:.1f}x)')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,4 +7,40 @@ resource "aws_dynamodb_table" "calendar_events" {
     name = "event_id"
     type = "S"
   }
+
+  # Reminder checkpoints expire a week after their occurrence
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
+
+resource "aws_dynamodb_table" "calendar_participants" {
+  name         = "calendar-participants-dev"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "event_id"
+  range_key    = "participant_email"
+
+  attribute {
+    name = "event_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "participant_email"
+    type = "S"
+  }
+
+  attribute {
+    name = "created_at"
+    type = "S"
+  }
+
+  # Participants in registration order, used to send reminders to late registrants
+  global_secondary_index {
+    name            = "event_id-created_at-index"
+    hash_key        = "event_id"
+    range_key       = "created_at"
+    projection_type = "KEYS_ONLY"
+  }
 }
@@ -0,0 +1,51 @@
+resource "aws_cloudwatch_event_rule" "calendar_feed_sync" {
+  provider = aws.virginia
+
+  name                = "calendar-feed-sync-dev"
+  description         = "Diff the calendar feed and apply changes to registered events"
+  schedule_expression = "rate(15 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "calendar_feed_sync" {
+  provider = aws.virginia
+
+  rule  = aws_cloudwatch_event_rule.calendar_feed_sync.name
+  arn   = aws_lambda_function.calendar.arn
+  input = jsonencode({ scheduled_task = "feed_sync" })
+}
+
+resource "aws_lambda_permission" "eventbridge_invoke_feed_sync" {
+  provider = aws.virginia
+
+  statement_id  = "AllowEventBridgeFeedSync"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.calendar.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.calendar_feed_sync.arn
+}
+
+resource "aws_cloudwatch_event_rule" "calendar_reminders" {
+  provider = aws.virginia
+
+  name                = "calendar-reminders-dev"
+  description         = "Send reminders for occurrences starting in the next 24 hours"
+  schedule_expression = "rate(15 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "calendar_reminders" {
+  provider = aws.virginia
+
+  rule  = aws_cloudwatch_event_rule.calendar_reminders.name
+  arn   = aws_lambda_function.calendar.arn
+  input = jsonencode({ scheduled_task = "reminders" })
+}
+
+resource "aws_lambda_permission" "eventbridge_invoke_reminders" {
+  provider = aws.virginia
+
+  statement_id  = "AllowEventBridgeReminders"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.calendar.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.calendar_reminders.arn
+}
@@ -19,7 +19,7 @@ resource "aws_iam_policy" "calendar" {
   name = "calendar-dev"
   policy = jsonencode({
     Version = "2012-10-17",
-    Statement = [
+    Statement = concat([
       {
         Effect = "Allow",
         Action = [
@@ -36,12 +36,26 @@ resource "aws_iam_policy" "calendar" {
         Action = [
           "dynamodb:PutItem",
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:Query"
         ]
-        Resource = "arn:aws:dynamodb:*:${data.aws_caller_identity.current.account_id}:table/calendar-events-dev"
+        Resource = [
+          "arn:aws:dynamodb:*:${data.aws_caller_identity.current.account_id}:table/calendar-events-dev",
+          "arn:aws:dynamodb:*:${data.aws_caller_identity.current.account_id}:table/calendar-participants-dev",
+          "arn:aws:dynamodb:*:${data.aws_caller_identity.current.account_id}:table/calendar-participants-dev/index/*"
+        ]
       }
-    ]
+      ],
+      # Profiles of sampled invocations (PROFILE_S3_BUCKET), only when a bucket is set
+      [for bucket in compact([var.profile_s3_bucket]) : {
+        Effect   = "Allow"
+        Action   = ["s3:PutObject"]
+        Resource = ["arn:aws:s3:::${bucket}/*"]
+      }]
+    )
   })
 }
 
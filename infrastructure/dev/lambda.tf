@@ -30,8 +30,14 @@ resource "aws_lambda_function" "calendar" {
       API_KEY_PARAM    = "/ops-master/cloudfront/dev/apikey"
       SECOND_KEY_PARAM = "/calendar/dev/payu-second-key"
 
-      ICAL_URL_PARAM      = "/calendar/dev/ical-feed-url"
-      DYNAMODB_TABLE_NAME = aws_dynamodb_table.calendar_events.name
+      ICAL_URL_PARAM          = "/calendar/dev/ical-feed-url"
+      DYNAMODB_TABLE_NAME     = aws_dynamodb_table.calendar_events.name
+      PARTICIPANTS_TABLE_NAME = aws_dynamodb_table.calendar_participants.name
+      FEED_UPDATE_EMAILS      = "false"
+      SMTP_MAX_CONNECTIONS    = "4"
+      SMTP_MAX_RATE           = "10"
+      PROFILE_SAMPLE_RATE     = "0"
+      PROFILE_S3_BUCKET       = var.profile_s3_bucket
     }
   }
 }
@@ -13,4 +13,8 @@ variable "ses_from_email" {
   description = "The email address to be used as the 'From' address in SES emails."
 }
 
-
+variable "profile_s3_bucket" {
+  type        = string
+  description = "S3 bucket that profiles of sampled invocations are uploaded to; empty to keep them in the function logs only."
+  default     = ""
+}
@@ -0,0 +1,5 @@
+variable "profile_s3_bucket" {
+  type        = string
+  description = "S3 bucket that profiles of sampled invocations are uploaded to; empty to keep them in the function logs only."
+  default     = ""
+}
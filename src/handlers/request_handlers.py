@@ -6,7 +6,8 @@ from services.calendar_service import (
     get_time_range_for_date,
     get_events_for_date,
     find_event_by_id,
-    format_event
+    format_event,
+    get_event_details
 )
 from services.dynamodb_service import get_attendee_count, update_event_participants
 from services.email_service import send_calendar_invitation
@@ -113,20 +114,15 @@ def handle_post_request(event, calendar):
     
     try:
         # Extract event details
-        event_summary = str(target_event.get('summary', 'Event'))
-        event_description = str(target_event.get('description', ''))
-        event_start = target_event.get('dtstart').dt
-        event_end = target_event.get('dtend').dt
-        event_location = str(target_event.get('location', ''))
-        
-        # Convert date to datetime if needed
-        if isinstance(event_start, datetime.date) and not isinstance(event_start, datetime.datetime):
-            event_start = datetime.datetime.combine(event_start, datetime.time(9, 0))
-        if isinstance(event_end, datetime.date) and not isinstance(event_end, datetime.datetime):
-            event_end = datetime.datetime.combine(event_end, datetime.time(17, 0))
+        event_details = get_event_details(target_event)
+        event_summary = event_details['summary']
+        event_description = event_details['description']
+        event_start = event_details['start']
+        event_end = event_details['end']
+        event_location = event_details['location']
         
         # Send invitation email with event UID and recurrence date (if applicable)
-        event_uid = str(target_event.get('uid'))
+        event_uid = event_details['uid']
         send_calendar_invitation(
             email, event_summary, event_description, 
             event_start, event_end, event_location,
@@ -0,0 +1,481 @@
+"""Handlers for scheduled (EventBridge) invocations."""
+import os
+import json
+import datetime
+
+from services.calendar_service import (
+    get_time_range_for_date,
+    get_event_details,
+    get_event_id
+)
+from services.recurrence_service import expand_events, prepare_calendar
+from services.feed_diff_service import (
+    compute_series_fingerprints,
+    get_active_uids,
+    get_changed_uids,
+    get_recurring_uids,
+    get_series_events,
+    get_series_occurrences,
+    diff_feed
+)
+from services.dynamodb_service import (
+    get_feed_snapshot_index,
+    get_feed_series_snapshots,
+    save_feed_snapshot,
+    update_event_details,
+    move_event_registrations,
+    queue_notifications,
+    get_pending_notifications,
+    save_notification_progress,
+    complete_notification,
+    get_event_participants,
+    get_reminder_checkpoints,
+    save_reminder_checkpoint,
+    get_reminder_templates,
+    DEFAULT_REMINDER_TEMPLATE_KEY
+)
+from services.email_service import (
+    BulkEmailSender,
+    create_invitation_message,
+    create_reminder_message,
+    compile_reminder_template
+)
+
+
+def handle_scheduled_event(event, calendar, context=None):
+    """
+    Route a scheduled invocation to the task named in its input.
+
+    Args:
+        event (dict): EventBridge input, e.g. {"scheduled_task": "feed_sync"}
+        calendar: iCalendar object
+        context: Lambda context object (used to stop before the timeout)
+
+    Returns:
+        dict: Response with status code and body
+    """
+    scheduled_task = event.get('scheduled_task')
+    if scheduled_task == 'feed_sync':
+        return handle_feed_sync(calendar, context)
+    if scheduled_task == 'reminders':
+        return handle_reminders(calendar, context)
+
+    print(f'Error: Unknown scheduled task {scheduled_task}')
+    return {
+        'statusCode': 400,
+        'body': f'Unknown scheduled task {scheduled_task}'
+    }
+
+
+def handle_feed_sync(calendar, context=None):
+    """
+    Diff the calendar feed against the previous snapshot and apply the changes.
+
+    Only series whose fingerprint changed are diffed. Moved and changed
+    occurrences get their DynamoDB rows updated, rescheduled single events
+    have their registrations moved to the new occurrence ID and removed
+    occurrences are marked as cancelled. If FEED_UPDATE_EMAILS is "true",
+    registered participants are sent an updated invitation or a cancellation.
+    Once a day, when the tracked range moves on, the snapshots of all other
+    series are refreshed so they cover the same range. Series whose
+    occurrences all ended before the range are not tracked at all.
+
+    Emails are queued in DynamoDB before the snapshot is saved and sent
+    afterwards with the same checkpointing as reminders, so a run that times
+    out or is retried neither loses nor repeats them; every run first sends
+    what earlier runs left over.
+
+    Args:
+        calendar: iCalendar object
+        context: Lambda context object, or None/{} when run locally
+
+    Returns:
+        dict: Response with status code and a summary of the changes
+    """
+    start, end = get_time_range_for_date(datetime.date.today())
+    previous_index = get_feed_snapshot_index()
+    # Convert and group the feed once instead of for every series expanded below
+    prepared = prepare_calendar(calendar)
+    active_uids = get_active_uids(prepared, start.date())
+    fingerprints = {
+        uid: fingerprint for uid, fingerprint in compute_series_fingerprints(calendar).items()
+        if uid in active_uids
+    }
+
+    if previous_index is None:
+        # First run: record a baseline without reporting every event as added
+        occurrences, _ = diff_feed(prepared, list(fingerprints), {}, start, end)
+        save_feed_snapshot(fingerprints, occurrences, end)
+        print(f'Created initial feed snapshot with {len(fingerprints)} series')
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'Initial feed snapshot created', 'series': len(fingerprints)})
+        }
+
+    changed_uids = get_changed_uids(previous_index.get('series', {}), fingerprints)
+    # Unchanged series still need their occurrences in the new part of the range,
+    # otherwise a later change to them could not be diffed there
+    stale_uids = []
+    if previous_index.get('window_end', '') < end.isoformat():
+        stale_uids = [uid for uid in fingerprints if uid not in changed_uids]
+    if not changed_uids and not stale_uids:
+        print('Feed unchanged since last snapshot')
+        emails_sent, complete = send_pending_notifications(context)
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'Feed unchanged', 'emails_sent': emails_sent, 'complete': complete})
+        }
+
+    occurrences = {uid: get_series_occurrences(prepared, uid, start, end) for uid in stale_uids}
+    previous_snapshots = get_feed_series_snapshots(changed_uids)
+    changed_occurrences, changes = diff_feed(prepared, changed_uids, previous_snapshots, start, end)
+    occurrences.update(changed_occurrences)
+    print('Feed changes: ' + ', '.join(f'{len(ids)} {name}' for name, ids in changes.items()))
+
+    send_emails = os.getenv('FEED_UPDATE_EMAILS', 'false').lower() == 'true'
+    notifications = {}
+
+    # Occurrences that reappeared may have been cancelled before
+    for event_id in changes['added']:
+        update_event_details(event_id, event_status='CONFIRMED')
+
+    recurring_uids = get_recurring_uids(prepared)
+    series_events = {}
+    for event_id in changes['moved'] + changes['changed']:
+        uid = event_id.rsplit('_', 1)[0]
+        if uid not in series_events:
+            series_events[uid] = get_series_events(prepared, uid, start, end)
+        event_details = get_event_details(series_events[uid][event_id])
+        previous = previous_snapshots[uid]['occurrences'][event_id]
+        # Calendar clients ignore updates that don't raise the sequence number
+        event_details['sequence'] = max(event_details['sequence'], int(previous.get('sequence', 0)) + 1)
+        updated = update_event_details(
+            event_id, event_details['summary'], event_details['start'], event_details['end']
+        )
+        if updated and send_emails:
+            # Keep the original RECURRENCE-ID so clients update the right occurrence
+            if uid in recurring_uids:
+                recurrence_id = series_events[uid][event_id].get('RECURRENCE-ID').dt
+            else:
+                # A single event's expanded RECURRENCE-ID is its new start,
+                # invitations were sent with the previous one
+                _, recurrence_id = get_snapshot_event_details(uid, previous)
+            notifications[event_id] = create_notification('update', event_details, recurrence_id)
+
+    for old_event_id, event_id in changes['rescheduled']:
+        uid = event_id.rsplit('_', 1)[0]
+        if uid not in series_events:
+            series_events[uid] = get_series_events(prepared, uid, start, end)
+        event_details = get_event_details(series_events[uid][event_id])
+        previous = previous_snapshots[uid]['occurrences'][old_event_id]
+        event_details['sequence'] = max(event_details['sequence'], int(previous.get('sequence', 0)) + 1)
+        moved = move_event_registrations(old_event_id, event_id)
+        update_event_details(
+            event_id, event_details['summary'], event_details['start'], event_details['end']
+        )
+        if moved and send_emails:
+            # Invitations were sent with the old start as RECURRENCE-ID
+            _, recurrence_id = get_snapshot_event_details(uid, previous)
+            notifications[event_id] = create_notification('update', event_details, recurrence_id)
+
+    for event_id in changes['removed']:
+        uid = event_id.rsplit('_', 1)[0]
+        previous = previous_snapshots[uid]['occurrences'][event_id]
+        updated = update_event_details(event_id, event_status='CANCELLED')
+        if updated and send_emails:
+            event_details, recurrence_id = get_snapshot_event_details(uid, previous)
+            notifications[event_id] = create_notification('cancellation', event_details, recurrence_id)
+
+    if notifications:
+        queue_notifications(notifications)
+    save_feed_snapshot(fingerprints, occurrences, end)
+    emails_sent, complete = send_pending_notifications(context)
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Feed synchronised',
+            'changes': changes,
+            'emails_sent': emails_sent,
+            'complete': complete
+        })
+    }
+
+
+def get_snapshot_event_details(uid, occurrence):
+    """
+    Rebuild event details of an occurrence that is no longer in the feed.
+
+    Args:
+        uid (str): Event series UID
+        occurrence (dict): Occurrence from the previous feed snapshot
+
+    Returns:
+        tuple: (event details like get_event_details(), recurrence date or datetime)
+    """
+    start = datetime.datetime.fromisoformat(occurrence['start'])
+    end = datetime.datetime.fromisoformat(occurrence['end'])
+    recurrence_id = start
+    if len(occurrence['start']) == len('YYYY-MM-DD'):
+        # All-day event, use the same default times as invitations
+        recurrence_id = start.date()
+        start = datetime.datetime.combine(start.date(), datetime.time(9, 0))
+        end = datetime.datetime.combine(end.date(), datetime.time(17, 0))
+
+    event_details = {
+        'summary': occurrence['summary'],
+        'description': '',
+        'start': start,
+        'end': end,
+        'location': '',
+        'uid': uid,
+        'sequence': int(occurrence.get('sequence', 0)) + 1
+    }
+    return event_details, recurrence_id
+
+
+def create_notification(message_type, event_details, recurrence_id):
+    """
+    Build the queued form of an updated invitation or a cancellation.
+
+    Args:
+        message_type (str): 'update' or 'cancellation'
+        event_details (dict): Event details as returned by get_event_details()
+        recurrence_id: Date or original start datetime of the occurrence
+
+    Returns:
+        dict: Notification for queue_notifications(), with dates as ISO strings
+    """
+    return {
+        'message_type': message_type,
+        'event_details': {
+            **event_details,
+            'start': event_details['start'].isoformat(),
+            'end': event_details['end'].isoformat()
+        },
+        'recurrence_id': recurrence_id.isoformat()
+    }
+
+
+def send_pending_notifications(context=None):
+    """
+    Send the queued updated invitations and cancellations to participants.
+
+    Args:
+        context: Lambda context object, or None/{} when run locally
+
+    Returns:
+        tuple: (emails sent, whether every queued notification was sent)
+    """
+    pending = get_pending_notifications()
+    if not pending:
+        return 0, True
+
+    emails_sent = 0
+    with BulkEmailSender(time_left=get_time_left(context)) as sender:
+        for event_id, notification in pending.items():
+            message_type = notification['message_type']
+            event_details = dict(notification['event_details'])
+            event_details['start'] = datetime.datetime.fromisoformat(event_details['start'])
+            event_details['end'] = datetime.datetime.fromisoformat(event_details['end'])
+            recurrence_id = datetime.datetime.fromisoformat(notification['recurrence_id'])
+            if len(notification['recurrence_id']) == len('YYYY-MM-DD'):
+                recurrence_id = recurrence_id.date()
+
+            def build_message(email):
+                return create_invitation_message(
+                    email, event_details['summary'], event_details['description'],
+                    event_details['start'], event_details['end'], event_details['location'],
+                    event_details['uid'], sender.smtp_settings, recurrence_id,
+                    message_type=message_type, sequence=int(event_details['sequence'])
+                )
+
+            def save_progress(last_key, sent_beyond, sent, failed):
+                save_notification_progress(event_id, last_key, sent_beyond, sent, failed)
+
+            sent, failed, complete = send_to_participants(
+                sender, event_id, build_message, notification, save_progress
+            )
+            emails_sent += sent
+            if failed:
+                print(f'Error sending {message_type} for event {event_id} to {failed} participant(s)')
+            if not complete:
+                print(f'Stopping notifications before the timeout, {event_id} resumes on the next run')
+                return emails_sent, False
+            complete_notification(event_id)
+            print(f'Sent {message_type} for event {event_id}: {sent} email(s)')
+    return emails_sent, True
+
+
+def handle_reminders(calendar, context=None):
+    """
+    Send reminders to the participants of occurrences starting in the next hours.
+
+    Participants are read from the registration time index one Query page at
+    a time and each page is sent as a parallel batch. Progress is
+    checkpointed after every batch, so every run only reads participants
+    registered after the checkpoint: the next run resumes where an
+    interrupted one stopped, and people who register later still get their
+    reminder. Sending stops when the Lambda is about to time out (see
+    BulkEmailSender).
+
+    Configuration (environment variables):
+        REMINDER_HOURS_AHEAD: How far ahead occurrences get reminders (default: 24)
+        REMINDER_BATCH_SIZE: Participants read and sent per batch (default: 50)
+
+    Args:
+        calendar: iCalendar object
+        context: Lambda context object, or None/{} when run locally
+
+    Returns:
+        dict: Response with status code and a summary of the run
+    """
+    hours_ahead = int(os.getenv('REMINDER_HOURS_AHEAD', '24'))
+    batch_size = int(os.getenv('REMINDER_BATCH_SIZE', '50'))
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    window_end = now + datetime.timedelta(hours=hours_ahead)
+    upcoming = {}
+    for event in expand_events(calendar, now, window_end):
+        event_details = get_event_details(event)
+        # Occurrences already in progress were due a reminder earlier
+        if str(event.get('status', '')).upper() != 'CANCELLED' and to_utc(event_details['start']) >= now:
+            upcoming[get_event_id(event)] = event_details
+
+    print(f'{len(upcoming)} occurrences in the next {hours_ahead} hours')
+    if not upcoming:
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'No reminders pending', 'occurrences': 0})
+        }
+
+    checkpoints = get_reminder_checkpoints(list(upcoming))
+    templates = get_reminder_templates([event_details['uid'] for event_details in upcoming.values()])
+    # The index is updated asynchronously; leave the last minute of registrations
+    # to the next run so none can show up behind the checkpoint
+    registered_before = (datetime.datetime.now() - datetime.timedelta(minutes=1)).isoformat()
+
+    emails_sent = emails_failed = 0
+    complete = True
+    with BulkEmailSender(time_left=get_time_left(context)) as sender:
+        for event_id, event_details in upcoming.items():
+            # Keep the checkpoint a week after the occurrence, then let the TTL remove it
+            expires_at = to_utc(event_details['end']) + datetime.timedelta(days=7)
+            render = compile_reminder_template(
+                templates.get(event_details['uid'], templates.get(DEFAULT_REMINDER_TEMPLATE_KEY)),
+                event_details
+            )
+
+            def save_checkpoint(last_key, sent_beyond, sent, failed):
+                save_reminder_checkpoint(event_id, last_key, sent_beyond, sent, failed, expires_at)
+
+            sent, failed, complete = send_to_participants(
+                sender, event_id,
+                lambda email: create_reminder_message(email, *render(email), sender.smtp_settings),
+                checkpoints.get(event_id, {}), save_checkpoint,
+                page_size=batch_size, registered_before=registered_before
+            )
+            emails_sent += sent
+            emails_failed += failed
+            if sent or failed:
+                print(f'Reminders for event {event_id}: {sent} sent, {failed} failed')
+            if not complete:
+                print(f'Stopping reminders before the timeout, {event_id} resumes on the next run')
+                break
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Reminders sent' if complete else 'Reminders partially sent, resuming on next run',
+            'occurrences': len(upcoming),
+            'emails_sent': emails_sent,
+            'emails_failed': emails_failed,
+            'complete': complete
+        })
+    }
+
+
+def get_time_left(context):
+    """
+    Get a function returning the seconds left before the Lambda times out.
+
+    Args:
+        context: Lambda context object, or None/{} when run locally
+
+    Returns:
+        function: Remaining time in seconds, or None for local runs without a deadline
+    """
+    if not hasattr(context, 'get_remaining_time_in_millis'):
+        return None
+    return lambda: context.get_remaining_time_in_millis() / 1000
+
+
+def send_to_participants(sender, event_id, build_message, checkpoint, save_checkpoint,
+                         page_size=50, registered_before=None):
+    """
+    Send a message to the participants of an event, resuming from a checkpoint.
+
+    Each page of participants is sent as one batch, skipping emails the
+    checkpoint lists as sent already. After every batch the progress is
+    passed to save_checkpoint(last_key, sent_beyond, sent, failed): last_key
+    is the Query key of the participant up to which every message was sent
+    or failed, sent_beyond the emails after it that were sent anyway because
+    the sender stopped mid-batch.
+
+    Args:
+        sender (BulkEmailSender): Sender used for every batch
+        event_id (str): Event UID (with _YYYYMMDD suffix)
+        build_message: Function returning the message for a participant email
+        checkpoint (dict): Previous progress ('last_key', 'sent_beyond', 'sent',
+            'failed'), empty to start from the first participant
+        save_checkpoint: Function storing the progress after every batch
+        page_size (int): Participants read and sent per batch
+        registered_before (str): Read participants in registration order, up to
+            this ISO datetime (see get_event_participants())
+
+    Returns:
+        tuple: (sent, failed, complete) where sent and failed count the messages
+            of this run and complete is False if the sender ran out of time
+    """
+    last_key = checkpoint.get('last_key')
+    already_sent = set(checkpoint.get('sent_beyond') or [])
+    total_sent, total_failed = int(checkpoint.get('sent', 0)), int(checkpoint.get('failed', 0))
+    sent = failed = 0
+    for participants in get_event_participants(event_id, page_size, last_key, registered_before):
+        if sender.out_of_time():
+            return sent, failed, False
+        emails = [participant['participant_email'] for participant in participants]
+        pending = [email for email in emails if email not in already_sent]
+        results = dict(zip(pending, sender.send_batch([build_message(email) for email in pending])))
+        sent += list(results.values()).count(True)
+        failed += list(results.values()).count(False)
+
+        # Messages are started in order, but a retried one can be skipped while
+        # a later one went out, so only a prefix of the page counts as handled
+        handled = 0
+        while handled < len(emails) and results.get(emails[handled], True) is not None:
+            handled += 1
+        if handled:
+            last_key = participants[handled - 1]
+        already_sent = (already_sent - set(emails[:handled])) | {
+            email for email in emails[handled:] if results.get(email) is True
+        }
+        save_checkpoint(last_key, sorted(already_sent), total_sent + sent, total_failed + failed)
+        if handled < len(emails):
+            return sent, failed, False
+    return sent, failed, True
+
+
+def to_utc(value):
+    """
+    Convert an event datetime to UTC; naive datetimes are taken as UTC.
+
+    Args:
+        value (datetime): Event start or end
+
+    Returns:
+        datetime: Timezone aware datetime in UTC
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
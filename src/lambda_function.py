@@ -4,6 +4,7 @@ AWS Lambda function for Calendar Event Management.
 This Lambda function handles:
 - GET requests: Retrieve upcoming calendar events with attendee counts
 - POST requests: Send calendar invitations via email and track participants
+- Scheduled invocations: Background tasks such as syncing calendar feed changes
 
 The function is organized into modular components:
 - handlers/: Request handling logic
@@ -18,9 +19,12 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from services.calendar_service import get_calendar_feed
 from handlers.request_handlers import handle_get_request, handle_post_request
+from handlers.scheduled_handlers import handle_scheduled_event
 from utils.validators import validate_api_key, validate_payu_signature
+from utils.profiling import profile_invocation
 
 
+@profile_invocation
 def lambda_handler(event, context):
     """
     Main Lambda handler function.
@@ -29,14 +33,24 @@ def lambda_handler(event, context):
     - GET: Retrieve calendar events
     - POST: Send calendar invitation
     
+    Scheduled invocations from EventBridge carry a "scheduled_task" key
+    instead of an HTTP request and are routed to the scheduled handlers.
+    
+    Invocations are profiled when PROFILE_INVOCATIONS or PROFILE_SAMPLE_RATE
+    is set (see utils/profiling.py).
+    
     Args:
-        event (dict): Lambda event object from CloudFront
+        event (dict): Lambda event object from CloudFront or EventBridge
         context: Lambda context object
         
     Returns:
         dict: Response with statusCode and body
     """
     try:
+        # Scheduled invocations come from EventBridge, not through the function URL
+        if 'scheduled_task' in event:
+            return handle_scheduled_event(event, get_calendar_feed(), context)
+        
         # Validate API key for all requests
         headers = event.get('headers', {})
         if not validate_api_key(headers):
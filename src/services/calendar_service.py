@@ -3,9 +3,9 @@ import os
 import datetime
 from urllib.request import urlopen
 from icalendar import Calendar
-import recurring_ical_events
 
 from utils.aws_services import get_ssm_parameter
+from services.recurrence_service import expand_events
 
 
 def get_calendar_feed():
@@ -57,8 +57,8 @@ def get_events_for_date(calendar, start_of_day, end_of_day):
     """
     print(f'Getting events for date from {start_of_day} to {end_of_day}')
     
-    # Use recurring_ical_events to expand recurring events
-    events = recurring_ical_events.of(calendar).between(start_of_day, end_of_day)
+    # Expand recurring events (simple DAILY/WEEKLY rules are computed directly)
+    events = expand_events(calendar, start_of_day, end_of_day)
     
     # Sort events by start time
     events_list = list(events)
@@ -113,8 +113,8 @@ def find_event_by_id(calendar, event_id):
         start_of_day = datetime.datetime.combine(recurrence_date, datetime.time.min)
         end_of_day = datetime.datetime.combine(recurrence_date, datetime.time.max)
         
-        # Expand recurring events for this specific date
-        events = recurring_ical_events.of(calendar).between(start_of_day, end_of_day)
+        # Expand only the matching series for this specific date
+        events = expand_events(calendar, start_of_day, end_of_day, uid=base_uid)
         
         # Find the specific occurrence matching both UID and date
         for event in events:
@@ -137,25 +137,17 @@ def find_event_by_id(calendar, event_id):
     return base_event, None
 
 
-def format_event(event, include_attendee_count=False, attendee_count=0):
+def get_event_id(event):
     """
-    Format iCalendar event for JSON response.
+    Get the ID of an event occurrence.
+    Recurring event occurrences use the format: uid_YYYYMMDD
     
     Args:
         event: iCalendar event component
-        include_attendee_count: Whether to include attendee count
-        attendee_count: Number of attendees (if include_attendee_count is True)
         
     Returns:
-        dict: Formatted event data
+        str: Event UID, with the RECURRENCE-ID date appended if present
     """
-    start = event.get('dtstart').dt
-    end = event.get('dtend').dt
-    
-    # Convert to ISO format strings
-    start_str = start.isoformat() if isinstance(start, datetime.datetime) else start.isoformat()
-    end_str = end.isoformat() if isinstance(end, datetime.datetime) else end.isoformat()
-
     # Get base UID
     event_id = str(event.get('uid'))
     
@@ -173,6 +165,62 @@ def format_event(event, include_attendee_count=False, attendee_count=0):
             recurrence_date = str(recurrence_dt).split()[0].replace('-', '')
         
         event_id = f"{event_id}_{recurrence_date}"
+    
+    return event_id
+
+
+def get_event_details(event):
+    """
+    Extract the details used in invitations from an event component.
+    All-day events are given a default time of 9:00-17:00.
+    
+    Args:
+        event: iCalendar event component
+        
+    Returns:
+        dict: Event summary, description, start, end, location, uid and sequence
+    """
+    event_start = event.get('dtstart').dt
+    event_end = event.get('dtend').dt
+    
+    # Convert date to datetime if needed
+    if isinstance(event_start, datetime.date) and not isinstance(event_start, datetime.datetime):
+        event_start = datetime.datetime.combine(event_start, datetime.time(9, 0))
+    if isinstance(event_end, datetime.date) and not isinstance(event_end, datetime.datetime):
+        event_end = datetime.datetime.combine(event_end, datetime.time(17, 0))
+    
+    return {
+        'summary': str(event.get('summary', 'Event')),
+        'description': str(event.get('description', '')),
+        'start': event_start,
+        'end': event_end,
+        'location': str(event.get('location', '')),
+        'uid': str(event.get('uid')),
+        'sequence': int(event.get('sequence', 0))
+    }
+
+
+def format_event(event, include_attendee_count=False, attendee_count=0):
+    """
+    Format iCalendar event for JSON response.
+    
+    Args:
+        event: iCalendar event component
+        include_attendee_count: Whether to include attendee count
+        attendee_count: Number of attendees (if include_attendee_count is True)
+        
+    Returns:
+        dict: Formatted event data
+    """
+    start = event.get('dtstart').dt
+    end = event.get('dtend').dt
+    
+    # Convert to ISO format strings
+    start_str = start.isoformat() if isinstance(start, datetime.datetime) else start.isoformat()
+    end_str = end.isoformat() if isinstance(end, datetime.datetime) else end.isoformat()
+
+    event_id = get_event_id(event)
+    if event.get('RECURRENCE-ID'):
         print(f'Event ID with recurrence: {event_id}')
     
     event_data = {
@@ -1,10 +1,68 @@
 """DynamoDB service for event and participant tracking."""
 import os
+import sys
+import csv
+import json
+import time
+import queue
+import random
+import argparse
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
 
 from utils.aws_services import get_ssm_parameter
 
+# Key layout for sharded counter mode. Shards live in the same table as the
+# event item, under keys derived from the event_id.
+SHARD_KEY_SEPARATOR = '#shard#'
+
+# Feed snapshot items used to diff calendar feed versions
+FEED_SNAPSHOT_KEY_PREFIX = 'feed#'
+FEED_SNAPSHOT_INDEX_KEY = 'feed#index'
+
+# Reminder items: per-occurrence send progress and per-series templates
+REMINDER_CHECKPOINT_KEY_PREFIX = 'reminder#'
+REMINDER_TEMPLATE_KEY_PREFIX = 'reminder_template#'
+DEFAULT_REMINDER_TEMPLATE_KEY = 'default'
+
+# Feed update emails waiting to be sent: one item per occurrence plus a set
+# of the occurrences that have one
+NOTIFICATION_KEY_PREFIX = 'notification#'
+PENDING_NOTIFICATIONS_KEY = 'notification#pending'
+
+# Participants table index keyed by event_id and created_at (KEYS_ONLY)
+PARTICIPANTS_CREATED_AT_INDEX = 'event_id-created_at-index'
+
+# Attempts of a registration transaction cancelled by a concurrent one
+TRANSACT_WRITE_ATTEMPTS = 5
+
+# DynamoDB BatchGetItem accepts at most 100 keys per request
+BATCH_GET_MAX_KEYS = 100
+
+# Attendee export: columns and rows buffered between scan workers and the writer
+EXPORT_FIELDS = ['event_id', 'event_summary', 'event_start', 'event_end', 'event_status',
+                 'participant_email', 'registered_at']
+EXPORT_QUEUE_SIZE = 1000
+
+
+def get_dynamodb_resource():
+    """
+    Get DynamoDB service resource.
+    
+    Returns:
+        boto3.resource: DynamoDB service resource
+    """
+    # Use AWS_PROFILE if set for local development
+    aws_profile = os.getenv('AWS_PROFILE')
+    if aws_profile:
+        session = boto3.Session(profile_name=aws_profile, region_name='eu-west-1')
+        return session.resource('dynamodb')
+    return boto3.resource('dynamodb', region_name='eu-west-1')
+
 
 def get_dynamodb_table():
     """
@@ -14,33 +72,192 @@ def get_dynamodb_table():
         boto3.Table: DynamoDB table resource
     """
     DYNAMODB_TABLE_NAME = os.getenv('DYNAMODB_TABLE_NAME', 'calendar-events-dev')
+    return get_dynamodb_resource().Table(DYNAMODB_TABLE_NAME)
+
+
+def get_participants_table():
+    """
+    Get DynamoDB participants table resource.
     
-    # Use AWS_PROFILE if set for local development
-    aws_profile = os.getenv('AWS_PROFILE')
-    if aws_profile:
-        session = boto3.Session(profile_name=aws_profile, region_name='eu-west-1')
-        dynamodb = session.resource('dynamodb')
-    else:
-        dynamodb = boto3.resource('dynamodb', region_name='eu-west-1')
+    The participants table stores one item per registration, keyed by
+    event_id (partition key) and participant_email (sort key).
+    
+    Returns:
+        boto3.Table: DynamoDB table resource
+    """
+    PARTICIPANTS_TABLE_NAME = os.getenv('PARTICIPANTS_TABLE_NAME', 'calendar-participants-dev')
+    return get_dynamodb_resource().Table(PARTICIPANTS_TABLE_NAME)
+
+
+def get_shard_count(event_id):
+    """
+    Get the number of counter shards configured for an event.
+    
+    Configuration is read from the DYNAMODB_COUNTER_SHARDS environment variable,
+    a JSON object mapping event IDs (either the full uid_YYYYMMDD occurrence ID
+    or the base UID) to shard counts, with an optional "default" entry, e.g.
+    {"default": 1, "abc123": 8}. A shard count of 1 keeps the single-item counter.
+    
+    This is the count new registrations are spread over. Counter items are
+    read with get_event_shard_count(), which also covers shards written
+    under a higher count configured earlier.
+    
+    Args:
+        event_id (str): Event UID (may include _YYYYMMDD suffix)
+        
+    Returns:
+        int: Number of counter shards (at least 1)
+    """
+    shards_config = os.getenv('DYNAMODB_COUNTER_SHARDS', '')
+    if not shards_config:
+        return 1
+    
+    try:
+        shards = json.loads(shards_config)
+    except ValueError:
+        print('Error: DYNAMODB_COUNTER_SHARDS is not valid JSON, sharding disabled')
+        return 1
+    
+    base_uid = event_id.rsplit('_', 1)[0] if '_' in event_id else event_id
+    shard_count = shards.get(event_id, shards.get(base_uid, shards.get('default', 1)))
+    
+    try:
+        return max(int(shard_count), 1)
+    except (TypeError, ValueError):
+        print(f'Error: Invalid shard count {shard_count} for event {event_id}, sharding disabled')
+        return 1
+
+
+def get_event_shard_count(event_id):
+    """
+    Get the number of counter shards that may hold counts of an event.
+    
+    Sharded registrations record the shard count on the event item, so
+    shards stay counted after the configured count is lowered or removed.
+    
+    Args:
+        event_id (str): Event UID
+        
+    Returns:
+        int: Highest of the stored and the configured shard count
+    """
+    response = get_dynamodb_table().get_item(
+        Key={'event_id': event_id},
+        ProjectionExpression='shard_count'
+    )
+    stored_count = response.get('Item', {}).get('shard_count', 1)
+    return max(int(stored_count), get_shard_count(event_id))
+
+
+def get_shard_keys(event_id, shard_count):
+    """
+    Build the keys of all counter items for an event.
+    
+    The event item itself is always included so counts written before
+    sharding was enabled are still taken into account.
+    
+    Args:
+        event_id (str): Event UID
+        shard_count (int): Number of counter shards
+        
+    Returns:
+        list: DynamoDB keys of the event item and its shard items
+    """
+    keys = [{'event_id': event_id}]
+    if shard_count > 1:
+        keys.extend(
+            {'event_id': f'{event_id}{SHARD_KEY_SEPARATOR}{shard}'}
+            for shard in range(shard_count)
+        )
+    return keys
+
+
+def get_sharded_attendee_count(event_id, shard_count, dynamodb=None, consistent_read=False):
+    """
+    Sum participant counts across all counter items of an event.
+    
+    Reads the event item and all of its shards with BatchGetItem,
+    projecting only the counter attributes. If the event item records more
+    shards than shard_count (the configured count was lowered), the
+    remaining shards are read too.
     
-    return dynamodb.Table(DYNAMODB_TABLE_NAME)
+    Args:
+        event_id (str): Event UID
+        shard_count (int): Number of configured counter shards
+        dynamodb: Optional DynamoDB service resource
+        consistent_read (bool): Read the counts right after updating them
+        
+    Returns:
+        int: Total number of attendees
+    """
+    dynamodb = dynamodb or get_dynamodb_resource()
+    table_name = os.getenv('DYNAMODB_TABLE_NAME', 'calendar-events-dev')
+    keys = get_shard_keys(event_id, shard_count)
+    
+    total = 0
+    stored_count = shard_count
+    while keys:
+        for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+            request_items = {
+                table_name: {
+                    'Keys': keys[start:start + BATCH_GET_MAX_KEYS],
+                    'ProjectionExpression': 'event_id, participant_count, shard_count',
+                    'ConsistentRead': consistent_read
+                }
+            }
+            # Retry keys DynamoDB could not process in this round (e.g. throttling)
+            while request_items:
+                response = dynamodb.batch_get_item(RequestItems=request_items)
+                for item in response.get('Responses', {}).get(table_name, []):
+                    count = item.get('participant_count', 0)
+                    total += int(count) if count else 0
+                    if item['event_id'] == event_id:
+                        stored_count = max(int(item.get('shard_count', 1)), shard_count)
+                request_items = response.get('UnprocessedKeys') or {}
+        keys = []
+        if stored_count > shard_count:
+            # get_shard_keys() only includes shard items above one shard
+            first_unread = shard_count if shard_count > 1 else 0
+            keys = [
+                {'event_id': f'{event_id}{SHARD_KEY_SEPARATOR}{shard}'}
+                for shard in range(first_unread, stored_count)
+            ]
+            shard_count = stored_count
+    
+    return total
 
 
-def get_attendee_count(event_id):
+def get_attendee_count(event_id, consistent_read=False):
     """
     Get the number of attendees for an event from DynamoDB.
     
+    Only the participant_count attribute is read, so the cost of the read
+    does not depend on the number of participants.
+    
     Args:
         event_id (str): Event UID
+        consistent_read (bool): Read the count right after updating it
         
     Returns:
         int: Number of attendees (0 if event not found or on error)
     """
     try:
+        shard_count = get_shard_count(event_id)
+        if shard_count > 1:
+            return get_sharded_attendee_count(event_id, shard_count)
+        
         table = get_dynamodb_table()
-        response = table.get_item(Key={'event_id': event_id})
+        response = table.get_item(
+            Key={'event_id': event_id},
+            ProjectionExpression='participant_count, shard_count',
+            ConsistentRead=consistent_read
+        )
         
         if 'Item' in response:
+            # Sharding was switched off after registrations went to shards
+            stored_count = int(response['Item'].get('shard_count', 1))
+            if stored_count > 1:
+                return get_sharded_attendee_count(event_id, stored_count, consistent_read=consistent_read)
             count = response['Item'].get('participant_count', 0)
             # Convert Decimal to int for JSON serialization
             return int(count) if count else 0
@@ -51,10 +268,135 @@ def get_attendee_count(event_id):
         return 0
 
 
+def register_participant(event_id, participant_email, counter_update, dynamodb=None, shard_count=1):
+    """
+    Store a participant registration and increment a counter in one transaction.
+    
+    The transaction puts the participant into the participants table (only if
+    the email is not registered yet) and applies counter_update to the event
+    item or one of its counter shards. Either both are written or nothing, so
+    a registration can never be stored without being counted. Emails in a
+    legacy participants list on the event item are treated as registered.
+    
+    For a sharded counter, shard_count is recorded on the event item before
+    the first shard is written, so the shards stay counted if the configured
+    shard count is lowered later.
+    
+    Args:
+        event_id (str): Event UID
+        participant_email (str): Email of participant to add
+        counter_update (dict): Key, UpdateExpression and ExpressionAttributeValues
+            of the counter item update
+        dynamodb: DynamoDB service resource (optional)
+        shard_count (int): Number of counter shards counter_update writes to
+        
+    Returns:
+        bool: True if the participant was registered, False if already registered
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    dynamodb = dynamodb or get_dynamodb_resource()
+    table_name = os.getenv('DYNAMODB_TABLE_NAME', 'calendar-events-dev')
+    participants_table_name = os.getenv('PARTICIPANTS_TABLE_NAME', 'calendar-participants-dev')
+    serializer = TypeSerializer()
+    
+    def serialize(values):
+        return {name: serializer.serialize(value) for name, value in values.items()}
+    
+    # Items created before participants were split out may still hold a
+    # participants list; don't count an email that is already in it
+    legacy_condition = 'attribute_not_exists(participants) OR NOT contains(participants, :email)'
+    counter_values = dict(counter_update['ExpressionAttributeValues'])
+    update = {
+        'TableName': table_name,
+        'Key': serialize(counter_update['Key']),
+        'UpdateExpression': counter_update['UpdateExpression']
+    }
+    transact_items = [{
+        'Put': {
+            'TableName': participants_table_name,
+            'Item': serialize({
+                'event_id': event_id,
+                'participant_email': participant_email,
+                'created_at': datetime.datetime.now().isoformat()
+            }),
+            'ConditionExpression': 'attribute_not_exists(participant_email)'
+        }
+    }]
+    if counter_update['Key'] == {'event_id': event_id}:
+        counter_values[':email'] = participant_email
+        update['ConditionExpression'] = legacy_condition
+    else:
+        # Checking the event item inside the transaction would make every
+        # sharded registration conflict on it again. Legacy lists are never
+        # appended to any more, so reading the list first is safe.
+        response = dynamodb.Table(table_name).get_item(
+            Key={'event_id': event_id},
+            ProjectionExpression='participants, shard_count'
+        )
+        event_item = response.get('Item', {})
+        if participant_email in event_item.get('participants', []):
+            print(f'Participant {participant_email} already registered for event {event_id}')
+            return False
+        # Written once per event (and per increase), not for every registration
+        if int(event_item.get('shard_count', 1)) < shard_count:
+            record_shard_count(event_id, shard_count, dynamodb)
+    update['ExpressionAttributeValues'] = serialize(counter_values)
+    transact_items.append({'Update': update})
+    
+    for attempt in range(TRANSACT_WRITE_ATTEMPTS):
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            if 'ConditionalCheckFailed' in reasons:
+                print(f'Participant {participant_email} already registered for event {event_id}')
+                return False
+            # Concurrent registrations for the same counter item cancel each other
+            if 'TransactionConflict' not in reasons or attempt == TRANSACT_WRITE_ATTEMPTS - 1:
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+def record_shard_count(event_id, shard_count, dynamodb=None):
+    """
+    Store the shard count of an event on its event item, never lowering it.
+    
+    Args:
+        event_id (str): Event UID
+        shard_count (int): Number of counter shards registrations are written to
+        dynamodb: DynamoDB service resource (optional)
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    dynamodb = dynamodb or get_dynamodb_resource()
+    table_name = os.getenv('DYNAMODB_TABLE_NAME', 'calendar-events-dev')
+    try:
+        dynamodb.Table(table_name).update_item(
+            Key={'event_id': event_id},
+            UpdateExpression='SET shard_count = :shard_count',
+            ConditionExpression='attribute_not_exists(shard_count) OR shard_count < :shard_count',
+            ExpressionAttributeValues={':shard_count': shard_count}
+        )
+        print(f'Recorded {shard_count} counter shards for event {event_id}')
+    except ClientError as e:
+        # A concurrent registration recorded the same or a higher count
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
 def update_event_participants(event_id, event_summary, event_start, event_end, participant_email):
     """
-    Check if event exists in DynamoDB and update participant count.
-    Creates new entry if event doesn't exist.
+    Register a participant and update the event participant count.
+    
+    The participant is stored as its own item in the participants table and
+    the event item only holds the aggregate count, which is incremented
+    atomically in the same transaction. Creates the event item if it doesn't exist.
     
     Args:
         event_id (str): Event UID
@@ -69,60 +411,822 @@ def update_event_participants(event_id, event_summary, event_start, event_end, p
     Raises:
         Exception: If DynamoDB operation fails
     """
-    table = get_dynamodb_table()
+    shard_count = get_shard_count(event_id)
+    if shard_count > 1:
+        return update_sharded_event_participants(
+            event_id, event_summary, event_start, event_end, participant_email, shard_count
+        )
     
     try:
-        # Try to get the existing event
-        response = table.get_item(Key={'event_id': event_id})
+        event_start_str = event_start.isoformat() if isinstance(event_start, datetime.datetime) else str(event_start)
+        event_end_str = event_end.isoformat() if isinstance(event_end, datetime.datetime) else str(event_end)
+        timestamp = datetime.datetime.now().isoformat()
         
-        if 'Item' in response:
-            # Event exists, increment participant count
-            current_count = response['Item'].get('participant_count', 0)
-            participants = response['Item'].get('participants', [])
-            
-            # Convert Decimal to int for proper arithmetic
-            current_count = int(current_count) if current_count else 0
-            
-            # Add new participant if not already in the list
-            if participant_email not in participants:
-                participants.append(participant_email)
-                new_count = current_count + 1
-            else:
-                new_count = current_count
-                print(f'Participant {participant_email} already registered for event {event_id}')
-            
-            # Update the event
-            table.update_item(
-                Key={'event_id': event_id},
-                UpdateExpression='SET participant_count = :count, participants = :participants, last_updated = :timestamp',
-                ExpressionAttributeValues={
-                    ':count': new_count,
-                    ':participants': participants,
-                    ':timestamp': datetime.datetime.now().isoformat()
-                }
-            )
+        registered = register_participant(event_id, participant_email, {
+            'Key': {'event_id': event_id},
+            'UpdateExpression': (
+                'ADD participant_count :one '
+                'SET event_summary = :summary, event_start = :start, event_end = :end, '
+                'created_at = if_not_exists(created_at, :timestamp), last_updated = :timestamp'
+            ),
+            'ExpressionAttributeValues': {
+                ':one': 1,
+                ':summary': event_summary,
+                ':start': event_start_str,
+                ':end': event_end_str,
+                ':timestamp': timestamp
+            }
+        })
+        
+        new_count = get_attendee_count(event_id, consistent_read=True)
+        if registered:
             print(f'Updated event {event_id}. Participant count: {new_count}')
-            return new_count
-        else:
-            # Event doesn't exist, create new entry
-            event_start_str = event_start.isoformat() if isinstance(event_start, datetime.datetime) else str(event_start)
-            event_end_str = event_end.isoformat() if isinstance(event_end, datetime.datetime) else str(event_end)
-            
-            table.put_item(
-                Item={
-                    'event_id': event_id,
-                    'event_summary': event_summary,
-                    'event_start': event_start_str,
-                    'event_end': event_end_str,
-                    'participant_count': 1,
-                    'participants': [participant_email],
-                    'created_at': datetime.datetime.now().isoformat(),
-                    'last_updated': datetime.datetime.now().isoformat()
-                }
-            )
-            print(f'Created new event {event_id} in DynamoDB with first participant')
-            return 1
+        return new_count
             
     except Exception as e:
         print(f'Error updating DynamoDB: {str(e)}')
         raise
+
+
+def update_sharded_event_participants(event_id, event_summary, event_start, event_end,
+                                      participant_email, shard_count):
+    """
+    Register a participant using a sharded counter.
+    
+    The registration and the increment of one of the event's counter shards,
+    picked at random, are written in one transaction. Concurrent registrations
+    for the same event are spread across shard_count items instead of
+    rewriting a single hot item.
+    
+    Args:
+        event_id (str): Event UID
+        event_summary (str): Event title
+        event_start: Event start datetime
+        event_end: Event end datetime
+        participant_email (str): Email of participant to add
+        shard_count (int): Number of counter shards
+        
+    Returns:
+        int: Updated participant count
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    dynamodb = get_dynamodb_resource()
+    
+    try:
+        event_start_str = event_start.isoformat() if isinstance(event_start, datetime.datetime) else str(event_start)
+        event_end_str = event_end.isoformat() if isinstance(event_end, datetime.datetime) else str(event_end)
+        
+        # Each shard carries the event details so it is self-describing
+        shard = random.randrange(shard_count)
+        registered = register_participant(event_id, participant_email, {
+            'Key': {'event_id': f'{event_id}{SHARD_KEY_SEPARATOR}{shard}'},
+            'UpdateExpression': (
+                'ADD participant_count :one '
+                'SET parent_event_id = :event_id, event_summary = :summary, '
+                'event_start = :start, event_end = :end, last_updated = :timestamp'
+            ),
+            'ExpressionAttributeValues': {
+                ':one': 1,
+                ':event_id': event_id,
+                ':summary': event_summary,
+                ':start': event_start_str,
+                ':end': event_end_str,
+                ':timestamp': datetime.datetime.now().isoformat()
+            }
+        }, dynamodb, shard_count)
+        
+        new_count = get_sharded_attendee_count(event_id, shard_count, dynamodb, consistent_read=True)
+        if registered:
+            print(f'Updated event {event_id} shard {shard}. Participant count: {new_count}')
+        return new_count
+        
+    except Exception as e:
+        print(f'Error updating sharded counter in DynamoDB: {str(e)}')
+        raise
+
+
+def migrate_event_participants(event_id):
+    """
+    Move the legacy participants list of an event item to the participants table.
+    
+    Copies every email from the event's participants list into the participants
+    table and removes the list from the event item, leaving only the count.
+    Safe to run more than once.
+    
+    Args:
+        event_id (str): Event UID
+        
+    Returns:
+        int: Number of participants moved
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    table = get_dynamodb_table()
+    response = table.get_item(
+        Key={'event_id': event_id},
+        ProjectionExpression='participants'
+    )
+    participants = response.get('Item', {}).get('participants')
+    if not participants:
+        print(f'No participants list to migrate for event {event_id}')
+        return 0
+    
+    timestamp = datetime.datetime.now().isoformat()
+    with get_participants_table().batch_writer(overwrite_by_pkeys=['event_id', 'participant_email']) as batch:
+        for participant_email in participants:
+            batch.put_item(Item={
+                'event_id': event_id,
+                'participant_email': participant_email,
+                'created_at': timestamp
+            })
+    
+    table.update_item(
+        Key={'event_id': event_id},
+        UpdateExpression='REMOVE participants SET last_updated = :timestamp',
+        ExpressionAttributeValues={':timestamp': timestamp}
+    )
+    print(f'Migrated {len(participants)} participants of event {event_id} to the participants table')
+    return len(participants)
+
+
+def find_events_with_participants_list():
+    """
+    Find event items that still hold a legacy participants list.
+    
+    Yields:
+        str: Event IDs to pass to migrate_event_participants()
+    """
+    table = get_dynamodb_table()
+    scan_kwargs = {
+        'ProjectionExpression': 'event_id',
+        'FilterExpression': 'attribute_exists(participants)'
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            yield item['event_id']
+        if 'LastEvaluatedKey' not in response:
+            return
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def get_event_participants(event_id, page_size=100, start_key=None, registered_before=None):
+    """
+    Iterate over the participants of an event, one Query page at a time.
+    
+    Participants are returned in email order, or with registered_before
+    from the PARTICIPANTS_CREATED_AT_INDEX in registration order, limited
+    to those registered before that time. Each participant is returned as
+    its Query key (event_id, participant_email and, from the index,
+    created_at), which can be passed back as start_key to resume after it.
+    
+    Args:
+        event_id (str): Event UID
+        page_size (int): Maximum number of participants read per request
+        start_key (dict): Resume after the participant with this key
+        registered_before (str): ISO datetime; read the registration time index
+            up to this time
+        
+    Yields:
+        list: Participant key items of each page
+    """
+    table = get_participants_table()
+    query_kwargs = {
+        'KeyConditionExpression': 'event_id = :event_id',
+        'ExpressionAttributeValues': {':event_id': event_id},
+        'ProjectionExpression': 'event_id, participant_email',
+        'Limit': page_size
+    }
+    if registered_before:
+        query_kwargs.update({
+            'IndexName': PARTICIPANTS_CREATED_AT_INDEX,
+            'KeyConditionExpression': 'event_id = :event_id AND created_at < :before',
+            'ExpressionAttributeValues': {':event_id': event_id, ':before': registered_before},
+            'ProjectionExpression': 'event_id, participant_email, created_at'
+        })
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+    while True:
+        response = table.query(**query_kwargs)
+        participants = response.get('Items', [])
+        if participants:
+            yield participants
+        if 'LastEvaluatedKey' not in response:
+            return
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def move_event_registrations(old_event_id, new_event_id):
+    """
+    Move the registrations of an occurrence to a new occurrence ID.
+    
+    Used when a single event is rescheduled to another day, which changes
+    its ID. Participants are copied to the new ID before they are deleted
+    from the old one. The counter items (event item and shards) are then
+    moved in one transaction that adds their counts to the new items and
+    deletes the old ones, so the counts are never lost or doubled. Safe to
+    run again after an interruption.
+    
+    Args:
+        old_event_id (str): Previous event UID with _YYYYMMDD suffix
+        new_event_id (str): New event UID with _YYYYMMDD suffix
+        
+    Returns:
+        int: Number of participants moved
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    dynamodb = get_dynamodb_resource()
+    table_name = os.getenv('DYNAMODB_TABLE_NAME', 'calendar-events-dev')
+    participants_table = get_participants_table()
+    migrate_event_participants(old_event_id)
+    
+    moved = 0
+    query_kwargs = {
+        'KeyConditionExpression': 'event_id = :event_id',
+        'ExpressionAttributeValues': {':event_id': old_event_id}
+    }
+    while True:
+        response = participants_table.query(**query_kwargs)
+        participants = response.get('Items', [])
+        with participants_table.batch_writer() as batch:
+            for participant in participants:
+                batch.put_item(Item={**participant, 'event_id': new_event_id})
+        with participants_table.batch_writer() as batch:
+            for participant in participants:
+                batch.delete_item(Key={
+                    'event_id': old_event_id,
+                    'participant_email': participant['participant_email']
+                })
+        moved += len(participants)
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    serializer = TypeSerializer()
+    old_keys = [key['event_id'] for key in get_shard_keys(old_event_id, get_event_shard_count(old_event_id))]
+    counters = batch_get_items(old_keys)
+    transact_items = []
+    for old_key in old_keys:
+        item = counters.get(old_key)
+        if not item:
+            continue
+        values = {':count': item.get('participant_count', 0), ':timestamp': datetime.datetime.now().isoformat()}
+        assignments = ['last_updated = :timestamp']
+        for name in ('event_summary', 'event_start', 'event_end', 'event_status', 'created_at', 'shard_count'):
+            if name in item:
+                values[f':{name}'] = item[name]
+                assignments.append(f'{name} = if_not_exists({name}, :{name})')
+        if 'parent_event_id' in item:
+            values[':parent_event_id'] = new_event_id
+            assignments.append('parent_event_id = :parent_event_id')
+        transact_items.append({'Update': {
+            'TableName': table_name,
+            'Key': {'event_id': serializer.serialize(new_event_id + old_key[len(old_event_id):])},
+            'UpdateExpression': 'ADD participant_count :count SET ' + ', '.join(assignments),
+            'ExpressionAttributeValues': {name: serializer.serialize(value) for name, value in values.items()}
+        }})
+        transact_items.append({'Delete': {
+            'TableName': table_name,
+            'Key': {'event_id': serializer.serialize(old_key)},
+            'ConditionExpression': 'attribute_exists(event_id)'
+        }})
+    
+    if transact_items:
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            if 'ConditionalCheckFailed' not in reasons:
+                raise
+            # An earlier, interrupted run already moved the counters
+            print(f'Counters of event {old_event_id} were already moved')
+    
+    print(f'Moved {moved} participants of event {old_event_id} to {new_event_id}')
+    return moved
+
+
+def update_event_details(event_id, event_summary=None, event_start=None, event_end=None, event_status=None):
+    """
+    Update the details stored on an event's counter items after the feed changed.
+    
+    Only items that already exist are updated; events nobody registered for
+    have no items and are skipped.
+    
+    Args:
+        event_id (str): Event UID
+        event_summary (str): New event title
+        event_start: New event start datetime
+        event_end: New event end datetime
+        event_status (str): New event status, e.g. 'CANCELLED'
+        
+    Returns:
+        int: Number of items updated
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    values = {':timestamp': datetime.datetime.now().isoformat()}
+    assignments = ['last_updated = :timestamp']
+    for name, value in (('event_summary', event_summary), ('event_start', event_start),
+                        ('event_end', event_end), ('event_status', event_status)):
+        if value is not None:
+            values[f':{name}'] = value.isoformat() if isinstance(value, datetime.date) else value
+            assignments.append(f'{name} = :{name}')
+    
+    table = get_dynamodb_table()
+    updated = 0
+    for key in get_shard_keys(event_id, get_event_shard_count(event_id)):
+        try:
+            table.update_item(
+                Key=key,
+                UpdateExpression='SET ' + ', '.join(assignments),
+                ConditionExpression='attribute_exists(event_id)',
+                ExpressionAttributeValues=values
+            )
+            updated += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    
+    if updated:
+        print(f'Updated details of event {event_id} on {updated} item(s)')
+    return updated
+
+
+def batch_get_items(event_ids):
+    """
+    Get items of the events table by key, BATCH_GET_MAX_KEYS keys per request.
+    
+    Args:
+        event_ids (list): Item keys (event_id values)
+        
+    Returns:
+        dict: Mapping of event_id to item, for the items that exist
+    """
+    dynamodb = get_dynamodb_resource()
+    table_name = os.getenv('DYNAMODB_TABLE_NAME', 'calendar-events-dev')
+    keys = [{'event_id': event_id} for event_id in event_ids]
+    
+    items = {}
+    for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request_items = {table_name: {'Keys': keys[start:start + BATCH_GET_MAX_KEYS]}}
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get('Responses', {}).get(table_name, []):
+                items[item['event_id']] = item
+            request_items = response.get('UnprocessedKeys') or {}
+    return items
+
+
+def get_feed_snapshot_index():
+    """
+    Get the index item of the last processed calendar feed.
+    
+    Returns:
+        dict: Index item with 'series' (mapping of UID to series fingerprint) and
+            'window_end' (end of the range all series snapshots cover), or None
+            if no snapshot exists
+    """
+    response = get_dynamodb_table().get_item(Key={'event_id': FEED_SNAPSHOT_INDEX_KEY})
+    return response.get('Item')
+
+
+def get_feed_series_snapshots(uids):
+    """
+    Get the stored occurrence snapshots of event series.
+    
+    Args:
+        uids (list): Event series UIDs
+        
+    Returns:
+        dict: Mapping of UID to its snapshot item ('occurrences', 'window_end')
+    """
+    items = batch_get_items([f'{FEED_SNAPSHOT_KEY_PREFIX}{uid}' for uid in uids])
+    return {event_id[len(FEED_SNAPSHOT_KEY_PREFIX):]: item for event_id, item in items.items()}
+
+
+def save_feed_snapshot(fingerprints, occurrences, window_end):
+    """
+    Store the snapshot of a processed calendar feed.
+    
+    Occurrence snapshots are written only for the given series (those that
+    changed, or all of them when the tracked range moved on); series that
+    disappeared from the feed or have no occurrences in the tracked range
+    have their snapshot deleted. The index item
+    with all series fingerprints is written last, so an interrupted run is
+    repeated on the next invocation.
+    
+    Args:
+        fingerprints (dict): Mapping of every UID in the feed to its fingerprint
+        occurrences (dict): Mapping of UIDs to their new occurrence snapshots
+        window_end: End datetime of the tracked range
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    table = get_dynamodb_table()
+    timestamp = datetime.datetime.now().isoformat()
+    with table.batch_writer() as batch:
+        for uid, series_occurrences in occurrences.items():
+            key = f'{FEED_SNAPSHOT_KEY_PREFIX}{uid}'
+            # A missing snapshot reads as one without occurrences, don't store those
+            if uid in fingerprints and series_occurrences:
+                batch.put_item(Item={
+                    'event_id': key,
+                    'fingerprint': fingerprints[uid],
+                    'occurrences': series_occurrences,
+                    'window_end': window_end.isoformat(),
+                    'last_updated': timestamp
+                })
+            else:
+                batch.delete_item(Key={'event_id': key})
+    
+    table.put_item(Item={
+        'event_id': FEED_SNAPSHOT_INDEX_KEY,
+        'series': fingerprints,
+        'window_end': window_end.isoformat(),
+        'last_updated': timestamp
+    })
+    print(f'Saved feed snapshot with {len(fingerprints)} series ({len(occurrences)} updated)')
+
+
+def get_reminder_checkpoints(event_ids):
+    """
+    Get the reminder progress of event occurrences.
+    
+    Args:
+        event_ids (list): Event UIDs (with _YYYYMMDD suffix)
+        
+    Returns:
+        dict: Mapping of event_id to its checkpoint ('last_key', 'sent_beyond',
+            'sent', 'failed') for occurrences with reminders sent
+    """
+    items = batch_get_items([f'{REMINDER_CHECKPOINT_KEY_PREFIX}{event_id}' for event_id in event_ids])
+    return {key[len(REMINDER_CHECKPOINT_KEY_PREFIX):]: item for key, item in items.items()}
+
+
+def save_reminder_checkpoint(event_id, last_key, sent_beyond, sent, failed, expires_at):
+    """
+    Record how far sending reminders for an event occurrence got.
+    
+    Args:
+        event_id (str): Event UID (with _YYYYMMDD suffix)
+        last_key (dict): Index key of the last participant up to which every
+            participant was handled, in registration order
+        sent_beyond (list): Emails after last_key that were sent already
+        sent (int): Number of reminders sent so far
+        failed (int): Number of reminders that could not be sent
+        expires_at (datetime): When DynamoDB may delete the checkpoint (TTL)
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    get_dynamodb_table().put_item(Item={
+        'event_id': f'{REMINDER_CHECKPOINT_KEY_PREFIX}{event_id}',
+        'last_key': last_key,
+        'sent_beyond': sent_beyond,
+        'sent': sent,
+        'failed': failed,
+        'last_updated': datetime.datetime.now().isoformat(),
+        'expires_at': int(expires_at.timestamp())
+    })
+
+
+def queue_notifications(notifications):
+    """
+    Store feed update emails to be sent to the participants of occurrences.
+    
+    A notification replaces any earlier one for the same occurrence that was
+    not sent completely, so participants only get the latest details.
+    
+    Args:
+        notifications (dict): Mapping of event_id to its notification
+            ('message_type', 'event_details', 'recurrence_id')
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    table = get_dynamodb_table()
+    timestamp = datetime.datetime.now().isoformat()
+    with table.batch_writer() as batch:
+        for event_id, notification in notifications.items():
+            batch.put_item(Item={
+                **notification,
+                'event_id': f'{NOTIFICATION_KEY_PREFIX}{event_id}',
+                'sent': 0,
+                'failed': 0,
+                'last_updated': timestamp
+            })
+    table.update_item(
+        Key={'event_id': PENDING_NOTIFICATIONS_KEY},
+        UpdateExpression='ADD event_ids :event_ids SET last_updated = :timestamp',
+        ExpressionAttributeValues={':event_ids': set(notifications), ':timestamp': timestamp}
+    )
+    print(f'Queued notifications for {len(notifications)} event(s)')
+
+
+def get_pending_notifications():
+    """
+    Get the feed update emails that were not sent completely yet.
+    
+    Returns:
+        dict: Mapping of event_id to its notification item, including the
+            progress saved by save_notification_progress()
+    """
+    response = get_dynamodb_table().get_item(Key={'event_id': PENDING_NOTIFICATIONS_KEY})
+    event_ids = response.get('Item', {}).get('event_ids', set())
+    items = batch_get_items([f'{NOTIFICATION_KEY_PREFIX}{event_id}' for event_id in sorted(event_ids)])
+    return {key[len(NOTIFICATION_KEY_PREFIX):]: item for key, item in sorted(items.items())}
+
+
+def save_notification_progress(event_id, last_key, sent_beyond, sent, failed):
+    """
+    Record how far sending a feed update email for an event occurrence got.
+    
+    Args:
+        event_id (str): Event UID (with _YYYYMMDD suffix)
+        last_key (dict): Key of the last participant up to which every
+            participant was handled, in email order
+        sent_beyond (list): Emails after last_key that were sent already
+        sent (int): Number of emails sent so far
+        failed (int): Number of emails that could not be sent
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    get_dynamodb_table().update_item(
+        Key={'event_id': f'{NOTIFICATION_KEY_PREFIX}{event_id}'},
+        UpdateExpression=(
+            'SET last_key = :last_key, sent_beyond = :sent_beyond, sent = :sent, '
+            'failed = :failed, last_updated = :timestamp'
+        ),
+        ExpressionAttributeValues={
+            ':last_key': last_key,
+            ':sent_beyond': sent_beyond,
+            ':sent': sent,
+            ':failed': failed,
+            ':timestamp': datetime.datetime.now().isoformat()
+        }
+    )
+
+
+def complete_notification(event_id):
+    """
+    Remove a feed update email that was sent to every participant.
+    
+    Args:
+        event_id (str): Event UID (with _YYYYMMDD suffix)
+        
+    Raises:
+        Exception: If DynamoDB operation fails
+    """
+    table = get_dynamodb_table()
+    table.delete_item(Key={'event_id': f'{NOTIFICATION_KEY_PREFIX}{event_id}'})
+    table.update_item(
+        Key={'event_id': PENDING_NOTIFICATIONS_KEY},
+        UpdateExpression='DELETE event_ids :event_ids',
+        ExpressionAttributeValues={':event_ids': {event_id}}
+    )
+
+
+def get_reminder_templates(uids):
+    """
+    Get the reminder templates of event series and the default template.
+    
+    Templates are items keyed reminder_template#<uid> (or
+    reminder_template#default) with 'subject' and 'body' attributes.
+    
+    Args:
+        uids (list): Event series UIDs
+        
+    Returns:
+        dict: Mapping of UID (or DEFAULT_REMINDER_TEMPLATE_KEY) to its template item
+    """
+    keys = [f'{REMINDER_TEMPLATE_KEY_PREFIX}{uid}' for uid in set(uids) | {DEFAULT_REMINDER_TEMPLATE_KEY}]
+    items = batch_get_items(keys)
+    return {key[len(REMINDER_TEMPLATE_KEY_PREFIX):]: item for key, item in items.items()}
+
+
+def create_session_resource():
+    """
+    Get a DynamoDB resource on a new boto3 session.
+    boto3 sessions and resources must not be shared between threads.
+    
+    Returns:
+        boto3.resource: DynamoDB service resource
+    """
+    session = boto3.Session(profile_name=os.getenv('AWS_PROFILE'), region_name='eu-west-1')
+    return session.resource('dynamodb')
+
+
+def scan_events_in_range(table, segment, total_segments, date_from, date_to):
+    """
+    Iterate over the event items of one Scan segment that start in a date range.
+    
+    Only the event details are projected, so legacy participants lists are
+    never read. Counter shards are returned too (with parent_event_id).
+    
+    Args:
+        table: Events table resource
+        segment (int): Scan segment number
+        total_segments (int): Number of parallel Scan segments
+        date_from (date): First day of the range
+        date_to (date): Last day of the range (inclusive)
+        
+    Yields:
+        dict: Event items
+    """
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ProjectionExpression': 'event_id, parent_event_id, event_summary, event_start, event_end, event_status',
+        # ISO timestamps compare correctly as strings
+        'FilterExpression': 'event_start >= :date_from AND event_start < :date_after',
+        'ExpressionAttributeValues': {
+            ':date_from': date_from.isoformat(),
+            ':date_after': (date_to + datetime.timedelta(days=1)).isoformat()
+        }
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def export_event_participants(date_from, date_to, total_segments=4):
+    """
+    Export the participants of events starting in a date range.
+    
+    The events table is read with a parallel segmented Scan, one thread per
+    segment, and each thread pages through the participants of the events it
+    finds. Rows are handed over through a bounded queue, so memory stays flat
+    however many participants are exported. Rows are not sorted.
+    
+    Participants still stored in a legacy participants list are not exported;
+    run the migrate command (migrate_event_participants()) first.
+    
+    Args:
+        date_from (date): First day of the range
+        date_to (date): Last day of the range (inclusive)
+        total_segments (int): Number of parallel Scan segments
+        
+    Yields:
+        dict: One row per participant with the EXPORT_FIELDS keys
+        
+    Raises:
+        Exception: If a DynamoDB operation fails
+    """
+    table_name = os.getenv('DYNAMODB_TABLE_NAME', 'calendar-events-dev')
+    participants_table_name = os.getenv('PARTICIPANTS_TABLE_NAME', 'calendar-participants-dev')
+    rows = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+    stopped = threading.Event()
+    exported_events = set()
+    lock = threading.Lock()
+    segment_done = object()
+    
+    def put(row):
+        # Give up if the consumer stopped reading, instead of blocking forever
+        while not stopped.is_set():
+            try:
+                rows.put(row, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def export_segment(segment):
+        try:
+            dynamodb = create_session_resource()
+            table = dynamodb.Table(table_name)
+            participants_table = dynamodb.Table(participants_table_name)
+            for item in scan_events_in_range(table, segment, total_segments, date_from, date_to):
+                # Shards of the same event may be found by other segments
+                event_id = item.get('parent_event_id', item['event_id'])
+                with lock:
+                    if event_id in exported_events:
+                        continue
+                    exported_events.add(event_id)
+                
+                event = {name: item.get(name, '') for name in EXPORT_FIELDS[1:5]}
+                query_kwargs = {
+                    'KeyConditionExpression': 'event_id = :event_id',
+                    'ExpressionAttributeValues': {':event_id': event_id},
+                    'ProjectionExpression': 'participant_email, created_at'
+                }
+                while True:
+                    response = participants_table.query(**query_kwargs)
+                    for participant in response.get('Items', []):
+                        row = {
+                            'event_id': event_id,
+                            **event,
+                            'participant_email': participant['participant_email'],
+                            'registered_at': participant.get('created_at', '')
+                        }
+                        if not put(row):
+                            return
+                    if 'LastEvaluatedKey' not in response:
+                        break
+                    query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        finally:
+            put(segment_done)
+    
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        futures = [executor.submit(export_segment, segment) for segment in range(total_segments)]
+        try:
+            finished = 0
+            while finished < total_segments:
+                row = rows.get()
+                if row is segment_done:
+                    finished += 1
+                else:
+                    yield row
+            for future in futures:
+                future.result()
+        finally:
+            stopped.set()
+
+
+def write_export(rows, output, output_format='ndjson', page_size=500):
+    """
+    Write export rows as NDJSON or CSV, flushing the output every page.
+    
+    Args:
+        rows: Iterable of export rows
+        output: Writable text file
+        output_format (str): 'ndjson' or 'csv'
+        page_size (int): Rows written between flushes
+        
+    Returns:
+        int: Number of rows written
+    """
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        write_row = writer.writerow
+    else:
+        def write_row(row):
+            output.write(json.dumps(row, default=str) + '\n')
+    
+    count = 0
+    for row in rows:
+        write_row(row)
+        count += 1
+        if count % page_size == 0:
+            output.flush()
+    output.flush()
+    return count
+
+
+def main(argv=None):
+    """
+    Command line utilities, run from the src directory:
+    
+        python -m services.dynamodb_service export --from 2025-01-01 --to 2025-01-31 --format csv
+        python -m services.dynamodb_service migrate [--event-id abc123_20250114]
+    
+    export writes the participants of events in a date range to stdout.
+    migrate moves legacy participants lists to the participants table, for
+    one event or every event that still has one.
+    
+    Access is controlled by the AWS credentials used (AWS_PROFILE), which
+    need dynamodb:Scan on the events table, dynamodb:Query on the
+    participants table and, for migrate, write access to both tables.
+    
+    Args:
+        argv (list): Command line arguments (default: sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description='Calendar DynamoDB utilities')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='Export event participants for a date range')
+    export_parser.add_argument('--from', dest='date_from', required=True, type=datetime.date.fromisoformat,
+                               help='First event date (YYYY-MM-DD)')
+    export_parser.add_argument('--to', dest='date_to', required=True, type=datetime.date.fromisoformat,
+                               help='Last event date (YYYY-MM-DD), inclusive')
+    export_parser.add_argument('--format', dest='output_format', choices=['ndjson', 'csv'], default='ndjson')
+    export_parser.add_argument('--segments', type=int, default=4, help='Parallel Scan segments')
+    migrate_parser = commands.add_parser('migrate', help='Move legacy participants lists to the participants table')
+    migrate_parser.add_argument('--event-id', help='Migrate only this event (default: every event with a list)')
+    args = parser.parse_args(argv)
+    
+    if args.command == 'migrate':
+        event_ids = [args.event_id] if args.event_id else find_events_with_participants_list()
+        migrated = sum(migrate_event_participants(event_id) for event_id in event_ids)
+        print(f'Migrated {migrated} participants')
+        return
+    
+    rows = export_event_participants(args.date_from, args.date_to, args.segments)
+    count = write_export(rows, sys.stdout, args.output_format)
+    print(f'Exported {count} participants', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 """Email service for sending calendar invitations via Brevo SMTP."""
 import os
+import time
+import string
 import datetime
 import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
@@ -11,8 +15,47 @@ from icalendar import Calendar, Event as ICalEvent
 from utils.aws_services import get_ssm_parameter
 
 
+# Brevo SMTP settings
+SMTP_SERVER = 'smtp-relay.brevo.com'
+SMTP_PORT = 587
+
+# Attempts per message when the relay answers with a transient (4xx) error
+SMTP_SEND_ATTEMPTS = 3
+
+# Socket timeout of SMTP operations in bulk sends, bounds how long a send can block
+SMTP_TIMEOUT_SECONDS = 3
+
+# Time kept after the last send for the caller to save its progress
+SEND_STOP_MARGIN_SECONDS = 1
+
+# Email subject prefixes and iCalendar METHOD per kind of message
+MESSAGE_TYPES = {
+    'invitation': ('Calendar Invitation', 'REQUEST'),
+    'update': ('Updated Invitation', 'REQUEST'),
+    'cancellation': ('Event Cancelled', 'CANCEL')
+}
+
+# Used when an event series has no reminder template of its own
+DEFAULT_REMINDER_TEMPLATE = {
+    'subject': 'Reminder: $summary',
+    'body': """
+This is a reminder about the event you registered for:
+
+Event: $summary
+Date: $start - $end
+Location: $location
+
+Please do not reply to this email. If you have any questions, contact the event organizer.
+"""
+}
+
+# Brevo SMTP settings read from SSM, cached per Lambda container
+_smtp_settings = None
+
+
 def create_ics_invitation(event_summary, event_description, event_start, event_end, 
-                         event_location, organizer_email, attendee_email, event_uid, recurrence_date=None):
+                         event_location, organizer_email, attendee_email, event_uid, recurrence_date=None,
+                         method='REQUEST', sequence=None):
     """
     Create an .ics calendar invitation file.
     
@@ -25,7 +68,9 @@ def create_ics_invitation(event_summary, event_description, event_start, event_e
         organizer_email (str): Organizer email address
         attendee_email (str): Attendee email address
         event_uid (str): Original event UID from calendar
-        recurrence_date: Date of specific occurrence (for recurring events)
+        recurrence_date: Date (or original start datetime) of specific occurrence (for recurring events)
+        method (str): iCalendar METHOD, 'REQUEST' or 'CANCEL'
+        sequence (int): Revision of the event, required for updates and cancellations
         
     Returns:
         bytes: iCalendar data in bytes
@@ -33,7 +78,7 @@ def create_ics_invitation(event_summary, event_description, event_start, event_e
     cal = Calendar()
     cal.add('prodid', '-//Calendar Booking System//EN')
     cal.add('version', '2.0')
-    cal.add('method', 'REQUEST')
+    cal.add('method', method)
     
     event = ICalEvent()
     event.add('summary', event_summary)
@@ -47,14 +92,19 @@ def create_ics_invitation(event_summary, event_description, event_start, event_e
     
     # Add RECURRENCE-ID for specific occurrences of recurring events
     if recurrence_date:
-        # Use the event start time with the recurrence date
-        if isinstance(event_start, datetime.datetime):
+        # Use the event start time with the recurrence date, unless the exact
+        # recurrence time is given (occurrences moved to another time)
+        if isinstance(recurrence_date, datetime.datetime):
+            recurrence_dt = recurrence_date
+        elif isinstance(event_start, datetime.datetime):
             recurrence_dt = datetime.datetime.combine(recurrence_date, event_start.time())
         else:
             recurrence_dt = recurrence_date
         event.add('recurrence-id', recurrence_dt)
         print(f'Added RECURRENCE-ID: {recurrence_dt} for specific event occurrence')
-    event.add('status', 'CONFIRMED')
+    event.add('status', 'CANCELLED' if method == 'CANCEL' else 'CONFIRMED')
+    if sequence is not None:
+        event.add('sequence', sequence)
     
     # Add organizer
     event.add('organizer', f'mailto:{organizer_email}')
@@ -71,10 +121,58 @@ def create_ics_invitation(event_summary, event_description, event_start, event_e
     return cal.to_ical()
 
 
-def send_calendar_invitation(to_email, event_summary, event_description, 
-                            event_start, event_end, event_location, event_uid, recurrence_date=None):
+def get_smtp_settings():
     """
-    Send calendar invitation via Brevo SMTP with .ics attachment.
+    Get the Brevo SMTP sender and credentials from SSM.
+    The parameters are read once per Lambda container.
+    
+    Returns:
+        dict: from_email, sender_name, username and password
+    """
+    global _smtp_settings
+    if _smtp_settings is None:
+        SMTP_FROM_EMAIL_PARAM = os.getenv('SMTP_FROM_EMAIL_PARAM', '/calendar/dev/smtp-from-email')
+        SMTP_USERNAME_PARAM = os.getenv('SMTP_USERNAME_PARAM', '/calendar/dev/smtp-username')
+        SMTP_PASSWORD_PARAM = os.getenv('SMTP_PASSWORD_PARAM', '/calendar/dev/smtp-password')
+        
+        _smtp_settings = {
+            'from_email': get_ssm_parameter(SMTP_FROM_EMAIL_PARAM),
+            'sender_name': "OpsMaster Trainings",
+            'username': get_ssm_parameter(SMTP_USERNAME_PARAM),
+            'password': get_ssm_parameter(SMTP_PASSWORD_PARAM)
+        }
+    return _smtp_settings
+
+
+def open_smtp_connection(smtp_settings, timeout=None):
+    """
+    Open an authenticated connection to the Brevo SMTP relay.
+    
+    Args:
+        smtp_settings (dict): Settings returned by get_smtp_settings()
+        timeout (float): Socket timeout in seconds, None to wait without a limit
+        
+    Returns:
+        smtplib.SMTP: Connection ready to send messages
+    """
+    if timeout is None:
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+    else:
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=timeout)
+    try:
+        server.starttls()
+        server.login(smtp_settings['username'], smtp_settings['password'])
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def create_invitation_message(to_email, event_summary, event_description,
+                              event_start, event_end, event_location, event_uid, smtp_settings,
+                              recurrence_date=None, message_type='invitation', sequence=None):
+    """
+    Create a calendar invitation email with .ics attachment.
     
     Args:
         to_email (str): Recipient email address
@@ -84,38 +182,33 @@ def send_calendar_invitation(to_email, event_summary, event_description,
         event_end: Event end datetime
         event_location (str): Event location
         event_uid (str): Original event UID from calendar
+        smtp_settings (dict): Settings returned by get_smtp_settings()
         recurrence_date: Date of specific occurrence (for recurring events)
+        message_type (str): 'invitation', 'update' or 'cancellation'
+        sequence (int): Revision of the event (for updates and cancellations)
         
     Returns:
-        dict: Response with success status
-        
-    Raises:
-        Exception: If email sending fails
+        MIMEMultipart: Email message
     """
-    # Get SMTP credentials from SSM
-    SMTP_FROM_EMAIL_PARAM = os.getenv('SMTP_FROM_EMAIL_PARAM', '/calendar/dev/smtp-from-email')
-    SMTP_SENDER_NAME_PARAM = os.getenv('SMTP_SENDER_NAME_PARAM', '/calendar/dev/smtp-sender-name')
-    SMTP_USERNAME_PARAM = os.getenv('SMTP_USERNAME_PARAM', '/calendar/dev/smtp-username')
-    SMTP_PASSWORD_PARAM = os.getenv('SMTP_PASSWORD_PARAM', '/calendar/dev/smtp-password')
+    from_email = smtp_settings['from_email']
+    sender_name = smtp_settings['sender_name']
     
-    from_email = get_ssm_parameter(SMTP_FROM_EMAIL_PARAM)
-    sender_name = "OpsMaster Trainings"
-    smtp_username = get_ssm_parameter(SMTP_USERNAME_PARAM)
-    smtp_password = get_ssm_parameter(SMTP_PASSWORD_PARAM)
-    
-    # Brevo SMTP settings
-    smtp_server = 'smtp-relay.brevo.com'
-    smtp_port = 587
+    subject_prefix, method = MESSAGE_TYPES[message_type]
     
     # Create the email message
     msg = MIMEMultipart('mixed')
-    msg['Subject'] = f'Calendar Invitation: {event_summary}'
+    msg['Subject'] = f'{subject_prefix}: {event_summary}'
     msg['From'] = f'{sender_name} <{from_email}>'
     msg['To'] = to_email
     
     # Email body
+    intro = {
+        'invitation': 'You have been invited to the following event:',
+        'update': 'The details of an event you registered for have changed:',
+        'cancellation': 'The following event you registered for has been cancelled:'
+    }[message_type]
     body_text = f"""
-You have been invited to the following event:
+{intro}
 
 Event: {event_summary}
 Date: {event_start.strftime('%Y-%m-%d %H:%M')} - {event_end.strftime('%Y-%m-%d %H:%M')}
@@ -135,20 +228,52 @@ Please do not reply to this email. If you have any questions, contact the event
     # Create .ics attachment
     ics_content = create_ics_invitation(
         event_summary, event_description, event_start, event_end, 
-        event_location, from_email, to_email, event_uid, recurrence_date
+        event_location, from_email, to_email, event_uid, recurrence_date,
+        method, sequence
     )
     
-    ics_attachment = MIMEBase('text', 'calendar', method='REQUEST', name='invite.ics')
+    ics_attachment = MIMEBase('text', 'calendar', method=method, name='invite.ics')
     ics_attachment.set_payload(ics_content)
     encoders.encode_base64(ics_attachment)
     ics_attachment.add_header('Content-Disposition', 'attachment', filename='invite.ics')
     msg.attach(ics_attachment)
+    return msg
+
+
+def send_calendar_invitation(to_email, event_summary, event_description, 
+                            event_start, event_end, event_location, event_uid, recurrence_date=None,
+                            message_type='invitation', sequence=None):
+    """
+    Send calendar invitation via Brevo SMTP with .ics attachment.
+    Also used to send updates and cancellations of an event already sent.
+    
+    Args:
+        to_email (str): Recipient email address
+        event_summary (str): Event title
+        event_description (str): Event description
+        event_start: Event start datetime
+        event_end: Event end datetime
+        event_location (str): Event location
+        event_uid (str): Original event UID from calendar
+        recurrence_date: Date of specific occurrence (for recurring events)
+        message_type (str): 'invitation', 'update' or 'cancellation'
+        sequence (int): Revision of the event (for updates and cancellations)
+        
+    Returns:
+        dict: Response with success status
+        
+    Raises:
+        Exception: If email sending fails
+    """
+    smtp_settings = get_smtp_settings()
+    msg = create_invitation_message(
+        to_email, event_summary, event_description, event_start, event_end,
+        event_location, event_uid, smtp_settings, recurrence_date, message_type, sequence
+    )
     
     # Send email via SMTP
     try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
+        with open_smtp_connection(smtp_settings) as server:
             server.send_message(msg)
         
         print(f'Email sent successfully to {to_email} via Brevo SMTP')
@@ -156,3 +281,182 @@ Please do not reply to this email. If you have any questions, contact the event
     except Exception as e:
         print(f'Error sending email via Brevo: {str(e)}')
         raise
+
+
+def compile_reminder_template(template, event_details):
+    """
+    Prepare a reminder template for one event occurrence.
+    
+    Templates use string.Template placeholders: $summary, $description,
+    $start, $end, $location and $email. Missing subject or body fall back
+    to DEFAULT_REMINDER_TEMPLATE.
+    
+    Args:
+        template (dict): Template item with 'subject' and 'body', or None
+        event_details (dict): Event details as returned by get_event_details()
+        
+    Returns:
+        function: Renders (subject, body) for a recipient email address
+    """
+    template = template or {}
+    subject = string.Template(template.get('subject') or DEFAULT_REMINDER_TEMPLATE['subject'])
+    body = string.Template(template.get('body') or DEFAULT_REMINDER_TEMPLATE['body'])
+    values = {
+        'summary': event_details['summary'],
+        'description': event_details['description'],
+        'start': event_details['start'].strftime('%Y-%m-%d %H:%M'),
+        'end': event_details['end'].strftime('%Y-%m-%d %H:%M'),
+        'location': event_details['location']
+    }
+    
+    def render(email):
+        return subject.safe_substitute(values, email=email), body.safe_substitute(values, email=email)
+    
+    return render
+
+
+def create_reminder_message(to_email, subject, body, smtp_settings):
+    """
+    Create a plain text reminder email.
+    
+    Args:
+        to_email (str): Recipient email address
+        subject (str): Rendered subject
+        body (str): Rendered body
+        smtp_settings (dict): Settings returned by get_smtp_settings()
+        
+    Returns:
+        MIMEText: Email message
+    """
+    msg = MIMEText(body, 'plain', 'utf-8')
+    msg['Subject'] = subject
+    msg['From'] = f"{smtp_settings['sender_name']} <{smtp_settings['from_email']}>"
+    msg['To'] = to_email
+    return msg
+
+
+class RateLimiter:
+    """Spaces out calls from several threads to at most `rate` per second."""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class BulkEmailSender:
+    """
+    Send many messages in parallel over reused SMTP connections.
+    
+    Each worker thread keeps one logged-in connection for the lifetime of
+    the sender, and all workers share a rate limit so bursts stay within
+    Brevo's sending limits. Use as a context manager to close the connections.
+    
+    With a time_left function (e.g. the Lambda context's remaining time), a
+    send is only started while there is time to finish it: one SMTP
+    operation (two when the connection has to be opened first) of at most
+    SMTP_TIMEOUT_SECONDS, plus SEND_STOP_MARGIN_SECONDS for the caller to
+    save its progress. Messages not started in time are reported as None.
+    
+    Configuration (environment variables):
+        SMTP_MAX_CONNECTIONS: Number of parallel connections (default: 4)
+        SMTP_MAX_RATE: Messages sent per second across connections (default: 10)
+    """
+    
+    def __init__(self, max_connections=None, max_rate=None, time_left=None):
+        self.smtp_settings = get_smtp_settings()
+        max_connections = max_connections or int(os.getenv('SMTP_MAX_CONNECTIONS', '4'))
+        max_rate = max_rate or float(os.getenv('SMTP_MAX_RATE', '10'))
+        self.executor = ThreadPoolExecutor(max_workers=max_connections)
+        self.rate_limiter = RateLimiter(max_rate)
+        self.time_left = time_left
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def out_of_time(self, delay=0, connect=True):
+        """
+        Check whether a send started after delay seconds could overrun the deadline.
+        
+        Args:
+            delay (float): Seconds until the send would start
+            connect (bool): Whether the send may have to open a connection first
+            
+        Returns:
+            bool: True if no send should be started any more
+        """
+        if self.time_left is None:
+            return False
+        needed = SMTP_TIMEOUT_SECONDS * (2 if connect else 1) + SEND_STOP_MARGIN_SECONDS
+        return self.time_left() < delay + needed
+    
+    def send_batch(self, messages):
+        """
+        Send messages and wait until every one was sent, failed or skipped.
+        
+        Args:
+            messages (list): Email messages with the recipient in the To header
+            
+        Returns:
+            list: For each message in the order given, True if it was sent,
+                False if it failed and None if it was not sent because the
+                deadline was near
+        """
+        return list(self.executor.map(self._send, messages))
+    
+    def close(self):
+        """Wait for the workers and log out of every SMTP connection."""
+        self.executor.shutdown(wait=True)
+        for server in self.connections:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        self.connections = []
+    
+    def _connection(self, reconnect=False):
+        server = getattr(self.local, 'server', None)
+        if server is None or reconnect:
+            server = open_smtp_connection(self.smtp_settings, SMTP_TIMEOUT_SECONDS)
+            self.local.server = server
+            with self.lock:
+                self.connections.append(server)
+        return server
+    
+    def _send(self, msg):
+        for attempt in range(SMTP_SEND_ATTEMPTS):
+            self.rate_limiter.wait()
+            reconnect = attempt > 0
+            if self.out_of_time(connect=reconnect or getattr(self.local, 'server', None) is None):
+                return None
+            try:
+                self._connection(reconnect=reconnect).send_message(msg)
+                return True
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+                # 4xx replies (e.g. 421 rate limited) and dropped connections are transient
+                transient = not isinstance(e, smtplib.SMTPResponseException) or 400 <= e.smtp_code < 500
+                if not transient or attempt == SMTP_SEND_ATTEMPTS - 1:
+                    print(f"Error sending email to {msg['To']} via Brevo: {str(e)}")
+                    return False
+                if self.out_of_time(delay=2 ** attempt):
+                    print(f"Not retrying email to {msg['To']} before the deadline: {str(e)}")
+                    return None
+                time.sleep(2 ** attempt)
+            except Exception as e:
+                print(f"Error sending email to {msg['To']} via Brevo: {str(e)}")
+                return False
+        return False
@@ -0,0 +1,246 @@
+"""Feed diff service for detecting changes between calendar feed versions."""
+import datetime
+import hashlib
+from collections import defaultdict
+
+from services.calendar_service import get_event_id
+from services.recurrence_service import expand_events, get_series_end
+
+# Properties that change on every feed download without the event changing
+VOLATILE_PROPERTIES = (b'DTSTAMP',)
+
+
+def fingerprint_component(component):
+    """
+    Compute a content fingerprint of a VEVENT component.
+
+    Args:
+        component: iCalendar event component
+
+    Returns:
+        str: Hex digest of the component content
+    """
+    lines = [
+        line for line in component.to_ical().splitlines()
+        if not line.startswith(VOLATILE_PROPERTIES)
+    ]
+    return hashlib.sha256(b'\n'.join(lines)).hexdigest()[:32]
+
+
+def compute_series_fingerprints(calendar):
+    """
+    Compute a fingerprint for every event series (all VEVENTs sharing a UID).
+
+    Args:
+        calendar: iCalendar object
+
+    Returns:
+        dict: Mapping of UID to series fingerprint
+    """
+    component_fingerprints = defaultdict(list)
+    for component in calendar.walk('VEVENT'):
+        component_fingerprints[str(component.get('uid'))].append(fingerprint_component(component))
+
+    return {
+        uid: hashlib.sha256(''.join(sorted(fingerprints)).encode('utf-8')).hexdigest()[:32]
+        for uid, fingerprints in component_fingerprints.items()
+    }
+
+
+def fingerprint_occurrence(event):
+    """
+    Compute a fingerprint of the details shown to participants of an occurrence.
+
+    Args:
+        event: iCalendar event component of a single occurrence
+
+    Returns:
+        str: Hex digest of summary, description and location
+    """
+    details = '\n'.join(
+        str(event.get(name, '')) for name in ('summary', 'description', 'location')
+    )
+    return hashlib.sha256(details.encode('utf-8')).hexdigest()[:32]
+
+
+def get_active_uids(calendar, since):
+    """
+    Find the series that still have occurrences ending on or after a date.
+
+    Google feeds keep every past event; leaving those series out keeps the
+    feed snapshot from growing with the feed's history.
+
+    Args:
+        calendar (PreparedCalendar): Prepared calendar feed
+        since (datetime.date): First date of the tracked range
+
+    Returns:
+        set: UIDs of series that can still occur
+    """
+    # Series ends ignore time zones, allow a day either way
+    since = since - datetime.timedelta(days=1)
+    active = set()
+    for uid, components in calendar.series.items():
+        series_end = get_series_end(components)
+        if series_end is None or series_end >= since:
+            active.add(uid)
+    return active
+
+
+def get_series_events(calendar, uid, start, end):
+    """
+    Expand one event series into its occurrences.
+
+    Args:
+        calendar (PreparedCalendar): Prepared calendar feed
+        uid (str): Event series UID
+        start: Start datetime of the tracked range
+        end: End datetime of the tracked range
+
+    Returns:
+        dict: Mapping of occurrence ID (uid_YYYYMMDD) to event component
+    """
+    return {get_event_id(event): event for event in expand_events(calendar, start, end, uid=uid)}
+
+
+def get_series_occurrences(calendar, uid, start, end):
+    """
+    Expand one event series into an occurrence snapshot.
+
+    Args:
+        calendar (PreparedCalendar): Prepared calendar feed
+        uid (str): Event series UID
+        start: Start datetime of the tracked range
+        end: End datetime of the tracked range
+
+    Returns:
+        dict: Mapping of occurrence ID (uid_YYYYMMDD) to its summary, start, end,
+            sequence and fingerprint
+    """
+    return {
+        occurrence_id: {
+            'summary': str(event.get('summary', '')),
+            'start': event.get('dtstart').dt.isoformat(),
+            'end': event.get('dtend').dt.isoformat(),
+            'sequence': int(event.get('sequence', 0)),
+            'fingerprint': fingerprint_occurrence(event)
+        }
+        for occurrence_id, event in get_series_events(calendar, uid, start, end).items()
+    }
+
+
+def diff_occurrences(previous, current, since, previous_until, recurring=True):
+    """
+    Compare two occurrence snapshots of an event series.
+
+    Occurrences of the previous snapshot that started before the since date
+    aged out and are ignored. Occurrences that only appear after the range
+    the previous snapshot covered (previous_until) entered the tracked range
+    as time passed and are not reported as added.
+
+    A single event has one occurrence whose ID carries its date, so moving it
+    to another day changes its ID. For a series that doesn't recur, one
+    removed and one added occurrence are therefore reported as rescheduled.
+
+    Args:
+        previous (dict): Previous occurrence snapshot
+        current (dict): Current occurrence snapshot
+        since (str): ISO date or datetime of the start of the tracked range
+        previous_until (str): ISO date or datetime of the end of the range the
+            previous snapshot covered
+        recurring (bool): Whether the series has a recurrence rule or dates
+
+    Returns:
+        dict: Lists of occurrence IDs under 'added', 'removed', 'moved' and
+            'changed', and [old ID, new ID] pairs under 'rescheduled'
+    """
+    # ISO dates compare correctly as strings
+    previous = {
+        occurrence_id: value for occurrence_id, value in previous.items()
+        if value['start'][:10] >= since[:10]
+    }
+
+    changes = {'added': [], 'removed': [], 'moved': [], 'changed': [], 'rescheduled': []}
+    added = sorted(current.keys() - previous.keys())
+    removed = sorted(previous.keys() - current.keys())
+    if not recurring and len(added) == 1 and len(removed) == 1:
+        changes['rescheduled'].append([removed[0], added[0]])
+        added, removed = [], []
+
+    changes['added'] = [
+        occurrence_id for occurrence_id in added
+        if current[occurrence_id]['start'][:10] <= previous_until[:10]
+    ]
+    changes['removed'] = removed
+    for occurrence_id in sorted(current.keys() & previous.keys()):
+        old, new = previous[occurrence_id], current[occurrence_id]
+        if (old['start'], old['end']) != (new['start'], new['end']):
+            changes['moved'].append(occurrence_id)
+        elif old['fingerprint'] != new['fingerprint']:
+            changes['changed'].append(occurrence_id)
+    return changes
+
+
+def get_recurring_uids(calendar):
+    """
+    Find the event series that recur.
+
+    Args:
+        calendar (PreparedCalendar): Prepared calendar feed
+
+    Returns:
+        set: UIDs of series with a recurrence rule, recurrence dates or
+            modified occurrences
+    """
+    return {
+        uid for uid, components in calendar.series.items()
+        if any(name in component for component in components for name in ('RRULE', 'RDATE', 'RECURRENCE-ID'))
+    }
+
+
+def diff_feed(calendar, changed_uids, previous_snapshots, start, end):
+    """
+    Diff the changed series of a new feed version against the previous snapshot.
+
+    Args:
+        calendar (PreparedCalendar): Prepared new feed version
+        changed_uids (list): UIDs whose series fingerprint changed
+        previous_snapshots (dict): Mapping of changed UIDs to their previous
+            snapshot item ('occurrences' and 'window_end')
+        start: Start datetime of the tracked range
+        end: End datetime of the tracked range
+
+    Returns:
+        tuple: (occurrences, changes) where occurrences maps each changed UID to
+            its new occurrence snapshot and changes holds the changes as
+            returned by diff_occurrences() for all series together
+    """
+    recurring_uids = get_recurring_uids(calendar)
+    occurrences = {}
+    changes = {'added': [], 'removed': [], 'moved': [], 'changed': [], 'rescheduled': []}
+    for uid in changed_uids:
+        occurrences[uid] = get_series_occurrences(calendar, uid, start, end)
+        previous = previous_snapshots.get(uid, {})
+        series_changes = diff_occurrences(
+            previous.get('occurrences', {}), occurrences[uid], start.isoformat(),
+            previous.get('window_end', end.isoformat()), recurring=uid in recurring_uids
+        )
+        for change_type, occurrence_ids in series_changes.items():
+            changes[change_type].extend(occurrence_ids)
+
+    return occurrences, changes
+
+
+def get_changed_uids(previous_fingerprints, fingerprints):
+    """
+    Find series that were added, removed or changed between two snapshots.
+
+    Args:
+        previous_fingerprints (dict): Previous mapping of UID to fingerprint
+        fingerprints (dict): Current mapping of UID to fingerprint
+
+    Returns:
+        list: Sorted UIDs of changed series
+    """
+    uids = previous_fingerprints.keys() | fingerprints.keys()
+    return sorted(uid for uid in uids if previous_fingerprints.get(uid) != fingerprints.get(uid))
@@ -0,0 +1,504 @@
+"""Recurrence expansion service for iCalendar events.
+
+Most events in the feed are single VEVENTs with a simple FREQ=DAILY or
+FREQ=WEEKLY rule (optionally with INTERVAL, BYDAY, COUNT, UNTIL and EXDATE).
+Their occurrences are computed arithmetically, jumping straight to the
+requested time range instead of iterating from DTSTART. Every other series
+(modified occurrences, RDATE, other frequencies, ...) is expanded by
+recurring_ical_events. Results match recurring_ical_events.of(calendar).between().
+"""
+import datetime
+from collections import defaultdict
+
+from dateutil import rrule as dateutil_rrule
+from icalendar import Calendar
+from icalendar.prop import vDDDTypes
+import recurring_ical_events
+import x_wr_timezone
+
+SUPPORTED_FREQUENCIES = {'DAILY', 'WEEKLY'}
+SUPPORTED_RULE_PARTS = {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY', 'WKST'}
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+# Attributes removed from expanded occurrences, as recurring_ical_events does
+RECURRENCE_ATTRIBUTES = ('RRULE', 'RDATE', 'EXDATE')
+
+
+class SimpleRecurrence:
+    """
+    A single-component series that can be expanded arithmetically.
+
+    Attributes:
+        component: The VEVENT component
+        start: DTSTART as datetime (naive midnight for all-day events)
+        duration: Length of each occurrence
+        all_day: Whether occurrences are returned as dates
+        frequency: 'DAILY' or 'WEEKLY', or None for a single occurrence
+        interval: Rule interval
+        count: Maximum number of rule occurrences, or None
+        until: Last allowed occurrence start, or None
+        weekdays: Weekday numbers for weekly rules
+        week_start: First day of the week (WKST) for weekly rules
+        excluded_datetimes: EXDATE values in every comparable form
+        excluded_dates: All-day EXDATE values
+    """
+
+    def __init__(self, component, start, duration, all_day):
+        self.component = component
+        self.start = start
+        self.duration = duration
+        self.all_day = all_day
+        self.frequency = None
+        self.interval = 1
+        self.count = None
+        self.until = None
+        self.weekdays = []
+        self.week_start = 0
+        self.excluded_datetimes = set()
+        self.excluded_dates = set()
+        self.sequence = component.get('SEQUENCE', -1)
+
+
+class PreparedCalendar:
+    """
+    A calendar converted to standard time zones with its events grouped by UID.
+
+    Preparing a feed once lets callers expand many series without
+    converting and walking the whole feed for each of them.
+
+    Attributes:
+        calendar: Calendar after x_wr_timezone.to_standard()
+        series: Mapping of UID to its VEVENT components, in feed order
+        gregorian: Whether the calendar uses the Gregorian calendar scale
+    """
+
+    def __init__(self, calendar):
+        self.gregorian = calendar.get('CALSCALE', 'GREGORIAN') == 'GREGORIAN'
+        if self.gregorian:
+            # Google feeds give UTC times and name the calendar's zone in X-WR-TIMEZONE;
+            # recurring_ical_events.of() moves those times into that zone first, so do the same
+            calendar = x_wr_timezone.to_standard(calendar)
+        self.calendar = calendar
+        self.series = defaultdict(list)
+        for component in calendar.walk('VEVENT'):
+            self.series[str(component.get('UID', id(component)))].append(component)
+
+
+def prepare_calendar(calendar, uid=None):
+    """
+    Convert and group a calendar once for repeated expansion.
+
+    Args:
+        calendar: iCalendar object
+        uid: Optional UID; only that series is kept, which avoids converting
+            the rest of the feed
+
+    Returns:
+        PreparedCalendar: Calendar ready for expand_events()
+    """
+    if uid is not None:
+        selected = Calendar(calendar)
+        for component in calendar.subcomponents:
+            if component.name == 'VTIMEZONE' or (
+                    component.name == 'VEVENT' and str(component.get('UID')) == uid):
+                selected.add_component(component)
+        calendar = selected
+    return PreparedCalendar(calendar)
+
+
+def expand_events(calendar, span_start, span_end, uid=None):
+    """
+    Expand events of a calendar into occurrences within a time range.
+
+    Args:
+        calendar: iCalendar object, or a PreparedCalendar when expanding many
+            series of the same feed
+        span_start: Start of the range (inclusive)
+        span_end: End of the range (exclusive)
+        uid: Optional UID to restrict the expansion to a single series
+
+    Returns:
+        list: Occurrence components, in the order recurring_ical_events returns them
+    """
+    prepared = calendar if isinstance(calendar, PreparedCalendar) else prepare_calendar(calendar, uid)
+    if not prepared.gregorian:
+        # Let recurring_ical_events raise its error for unsupported calendars
+        return list(recurring_ical_events.of(prepared.calendar).between(span_start, span_end))
+
+    if uid is None:
+        series = prepared.series
+    else:
+        series = {uid: prepared.series[uid]} if uid in prepared.series else {}
+
+    occurrences = {}
+    fallback_calendar = None
+    for series_uid, components in series.items():
+        recurrence = get_simple_recurrence(components)
+        if recurrence is None:
+            if fallback_calendar is None:
+                # Keep calendar properties (X-WR-TIMEZONE, ...) and time zone definitions
+                fallback_calendar = Calendar(prepared.calendar)
+                for timezone in prepared.calendar.subcomponents:
+                    if timezone.name == 'VTIMEZONE':
+                        fallback_calendar.add_component(timezone)
+            for component in components:
+                fallback_calendar.add_component(component)
+            occurrences[series_uid] = []
+        else:
+            occurrences[series_uid] = list(expand_simple_recurrence(recurrence, span_start, span_end))
+
+    if fallback_calendar is not None:
+        for occurrence in recurring_ical_events.of(fallback_calendar).between(span_start, span_end):
+            occurrences.setdefault(str(occurrence.get('UID')), []).append(occurrence)
+
+    return [occurrence for series_occurrences in occurrences.values() for occurrence in series_occurrences]
+
+
+def get_series_end(components):
+    """
+    Find the last date a series has an occurrence on, without expanding it.
+
+    Rules with UNTIL end there, rules with COUNT are iterated to their last
+    occurrence and all other parts of the series end with their DTEND or
+    last RDATE. Time zones are ignored, so callers should allow a day.
+
+    Args:
+        components (list): VEVENT components sharing one UID
+
+    Returns:
+        datetime.date: Date the last occurrence ends, or None if the series
+            recurs forever or can't be bounded
+    """
+    last = None
+    for component in components:
+        try:
+            end = _get_component_end(component)
+        except (TypeError, ValueError):
+            return None
+        if end is None:
+            return None
+        last = end if last is None else max(last, end)
+    return last
+
+
+def _get_component_end(component):
+    """Date the last occurrence of one VEVENT ends, or None if unbounded."""
+    if 'DTSTART' not in component:
+        return None
+    start = component['DTSTART'].dt
+    if 'DTEND' in component:
+        duration = component['DTEND'].dt - start
+    elif 'DURATION' in component:
+        duration = component['DURATION'].dt
+    else:
+        duration = datetime.timedelta(days=1) if _is_date(start) else datetime.timedelta(0)
+
+    starts = [start]
+    rdates = component.get('RDATE', [])
+    for rdate in rdates if isinstance(rdates, list) else [rdates]:
+        for value in rdate.dts:
+            if isinstance(value.dt, tuple):
+                # RDATE periods
+                return None
+            starts.append(value.dt)
+
+    rules = component.get('RRULE')
+    for rule in rules if isinstance(rules, list) else [] if rules is None else [rules]:
+        if rule.get('UNTIL'):
+            starts.append(rule['UNTIL'][0])
+        elif rule.get('COUNT'):
+            if isinstance(start, datetime.datetime):
+                naive_start = start.replace(tzinfo=None)
+            else:
+                naive_start = datetime.datetime.combine(start, datetime.time())
+            starts.extend(list(dateutil_rrule.rrulestr(rule.to_ical().decode(), dtstart=naive_start))[-1:])
+        else:
+            return None
+
+    ends = [value + duration for value in starts]
+    return max(end.date() if isinstance(end, datetime.datetime) else end for end in ends)
+
+
+def get_simple_recurrence(components):
+    """
+    Check whether a series can be expanded arithmetically.
+
+    Args:
+        components (list): VEVENT components sharing one UID
+
+    Returns:
+        SimpleRecurrence: Parsed series, or None if it needs recurring_ical_events
+    """
+    if len(components) != 1:
+        return None
+    component = components[0]
+    if 'RECURRENCE-ID' in component or 'RDATE' in component or 'DTSTART' not in component:
+        return None
+
+    raw_start = component['DTSTART'].dt
+    if _is_pytz(raw_start):
+        return None
+
+    # Work out the end the same way recurring_ical_events does
+    if 'DTEND' in component:
+        raw_end = component['DTEND'].dt
+    elif 'DURATION' in component:
+        if _is_date(raw_start):
+            return None
+        raw_end = raw_start + component['DURATION'].dt
+    elif _is_date(raw_start):
+        raw_end = raw_start + datetime.timedelta(days=1)
+    else:
+        raw_end = raw_start
+
+    if _is_date(raw_start) != _is_date(raw_end) or _is_pytz(raw_end):
+        return None
+    if not _is_date(raw_start) and raw_start.tzinfo is None and raw_end.tzinfo is not None:
+        return None
+    start, end = _make_comparable((raw_start, raw_end))
+    if start > end:
+        return None
+
+    all_day = _is_date(raw_start)
+    recurrence = SimpleRecurrence(component, _to_datetime(start, None) if all_day else start, end - start, all_day)
+
+    if not _parse_exdates(recurrence, component.get('EXDATE', [])):
+        return None
+
+    rules = component.get('RRULE')
+    if rules is None:
+        return recurrence
+    if isinstance(rules, list):
+        if len(rules) != 1:
+            return None
+        rules = rules[0]
+    if not _parse_rule(recurrence, rules):
+        return None
+    return recurrence
+
+
+def _parse_exdates(recurrence, exdates):
+    """Collect EXDATE values of a series. Returns False if unsupported."""
+    tzinfo = recurrence.start.tzinfo
+    for exdate_property in exdates if isinstance(exdates, list) else [exdates]:
+        for exdate in exdate_property.dts:
+            value = exdate.dt
+            if _is_pytz(value):
+                return False
+            if isinstance(value, datetime.datetime):
+                # A timed EXDATE changes how recurring_ical_events treats
+                # floating and all-day series
+                if recurrence.all_day or (tzinfo is None and value.tzinfo is not None):
+                    return False
+            else:
+                recurrence.excluded_dates.add(value)
+            recurrence.excluded_datetimes.update(_to_recurrence_ids(value))
+            recurrence.excluded_datetimes.add(_to_datetime(value, tzinfo))
+    return True
+
+
+def _parse_rule(recurrence, rule):
+    """Read a vRecur rule into the series. Returns False if unsupported."""
+    if not set(rule) <= SUPPORTED_RULE_PARTS:
+        return False
+
+    frequency = rule.get('FREQ', [None])[0]
+    if frequency not in SUPPORTED_FREQUENCIES:
+        return False
+    recurrence.frequency = frequency
+
+    try:
+        recurrence.interval = int(rule.get('INTERVAL', [1])[0])
+        if 'COUNT' in rule:
+            recurrence.count = int(rule['COUNT'][0])
+    except (TypeError, ValueError):
+        return False
+    if recurrence.interval < 1 or (recurrence.count is not None and recurrence.count < 1):
+        return False
+
+    week_start = rule.get('WKST', ['MO'])[0]
+    weekdays = rule.get('BYDAY', [])
+    if week_start not in WEEKDAYS or any(weekday not in WEEKDAYS for weekday in weekdays):
+        return False
+    if frequency == 'DAILY' and weekdays:
+        return False
+    recurrence.week_start = WEEKDAYS.index(week_start)
+    recurrence.weekdays = sorted({WEEKDAYS.index(weekday) for weekday in weekdays}) or [recurrence.start.weekday()]
+
+    if 'UNTIL' in rule:
+        until = rule['UNTIL'][0]
+        if recurrence.start.tzinfo is not None:
+            # Only UTC UNTIL values behave the same in dateutil and
+            # recurring_ical_events for zoned series
+            if not isinstance(until, datetime.datetime) or until.tzinfo is None:
+                return False
+            recurrence.until = until
+        elif isinstance(until, datetime.datetime):
+            if recurrence.all_day and until.tzinfo is not None:
+                until = datetime.datetime.combine(until.date(), datetime.time.min)
+            recurrence.until = until.replace(tzinfo=None)
+        else:
+            recurrence.until = datetime.datetime.combine(until, datetime.time.min)
+    return True
+
+
+def expand_simple_recurrence(recurrence, span_start, span_end):
+    """
+    Generate occurrence components of a simple series within a time range.
+
+    Args:
+        recurrence (SimpleRecurrence): Parsed series
+        span_start: Start of the range (inclusive)
+        span_end: End of the range (exclusive)
+
+    Yields:
+        Event component for each occurrence
+    """
+    tzinfo = recurrence.start.tzinfo
+    # Any occurrence overlapping the range starts in this window
+    first_date = (_to_datetime(span_start, tzinfo) - recurrence.duration).date() - datetime.timedelta(days=1)
+    last_date = _to_datetime(span_end, tzinfo).date() + datetime.timedelta(days=1)
+
+    starts = set()
+    if recurrence.until is None or recurrence.start <= recurrence.until:
+        # DTSTART is always an occurrence, even if the rule does not match it
+        if first_date <= recurrence.start.date() <= last_date:
+            starts.add(recurrence.start)
+    if recurrence.frequency == 'DAILY':
+        starts.update(_daily_starts(recurrence, first_date, last_date))
+    elif recurrence.frequency == 'WEEKLY':
+        starts.update(_weekly_starts(recurrence, first_date, last_date))
+
+    for start in sorted(starts):
+        if (start.date() in recurrence.excluded_dates
+                or recurrence.excluded_datetimes.intersection(_to_recurrence_ids(start))):
+            continue
+        end = start + recurrence.duration
+        if recurrence.all_day:
+            start, end = start.date(), end.date()
+        if _time_span_contains_event(span_start, span_end, start, end):
+            yield _as_component(recurrence, start, end)
+
+
+def _daily_starts(recurrence, first_date, last_date):
+    """Rule occurrences of a FREQ=DAILY series between two dates."""
+    start = recurrence.start
+    days = (first_date - start.date()).days
+    index = max(0, days // recurrence.interval)
+    while recurrence.count is None or index < recurrence.count:
+        occurrence_date = start.date() + datetime.timedelta(days=index * recurrence.interval)
+        if occurrence_date > last_date:
+            break
+        occurrence = _combine(occurrence_date, start)
+        if recurrence.until is not None and occurrence > recurrence.until:
+            break
+        yield occurrence
+        index += 1
+
+
+def _weekly_starts(recurrence, first_date, last_date):
+    """Rule occurrences of a FREQ=WEEKLY series between two dates."""
+    start = recurrence.start
+    first_week = start.date() - datetime.timedelta(days=(start.weekday() - recurrence.week_start) % 7)
+    offsets = sorted((weekday - recurrence.week_start) % 7 for weekday in recurrence.weekdays)
+    # Occurrences in the first week before DTSTART are not part of the rule
+    first_week_count = sum(1 for offset in offsets if offset >= (start.date() - first_week).days)
+
+    period_days = 7 * recurrence.interval
+    period = max(0, (first_date - first_week).days // period_days)
+    while True:
+        week = first_week + datetime.timedelta(days=period * period_days)
+        if week > last_date:
+            return
+        index = 0 if period == 0 else first_week_count + (period - 1) * len(offsets)
+        for offset in offsets:
+            occurrence_date = week + datetime.timedelta(days=offset)
+            if occurrence_date < start.date():
+                continue
+            if recurrence.count is not None and index >= recurrence.count:
+                return
+            index += 1
+            occurrence = _combine(occurrence_date, start)
+            if recurrence.until is not None and occurrence > recurrence.until:
+                return
+            if occurrence_date > last_date:
+                return
+            yield occurrence
+        period += 1
+
+
+def _as_component(recurrence, start, end):
+    """Copy the series component for one occurrence, as recurring_ical_events does."""
+    component = recurrence.component
+    occurrence = component.copy()
+    occurrence['DTSTART'] = vDDDTypes(start)
+    occurrence.pop('DURATION', None)
+    occurrence['DTEND'] = vDDDTypes(end)
+    for attribute in RECURRENCE_ATTRIBUTES:
+        if attribute in occurrence:
+            del occurrence[attribute]
+    for subcomponent in component.subcomponents:
+        occurrence.add_component(subcomponent)
+    if 'RECURRENCE-ID' not in occurrence:
+        occurrence['RECURRENCE-ID'] = vDDDTypes(start)
+    if recurrence.sequence >= 0:
+        occurrence['SEQUENCE'] = recurrence.sequence
+    return occurrence
+
+
+def _combine(date, start):
+    """Place the wall-clock time of start on another date."""
+    return datetime.datetime.combine(date, start.time(), tzinfo=start.tzinfo)
+
+
+def _is_date(value):
+    """Whether value is a date and not a datetime."""
+    return isinstance(value, datetime.date) and not isinstance(value, datetime.datetime)
+
+
+def _is_pytz(value):
+    """Whether value uses a pytz time zone, which needs localize()/normalize()."""
+    return isinstance(value, datetime.datetime) and hasattr(value.tzinfo, 'localize')
+
+
+def _to_datetime(value, tzinfo):
+    """Convert a date or datetime to a datetime in tzinfo (or naive if None)."""
+    if _is_date(value):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        return value if tzinfo is None else value.replace(tzinfo=tzinfo)
+    return value.replace(tzinfo=None) if tzinfo is None else value
+
+
+def _make_comparable(values):
+    """Convert dates and datetimes to a common type so they can be compared."""
+    if all(_is_date(value) for value in values):
+        return list(values)
+    tzinfo = next(
+        (value.tzinfo for value in values if isinstance(value, datetime.datetime) and value.tzinfo),
+        None
+    )
+    return [_to_datetime(value, tzinfo) for value in values]
+
+
+def _to_recurrence_ids(value):
+    """The forms in which a start time can match an EXDATE."""
+    if not isinstance(value, datetime.datetime):
+        return (_to_datetime(value, None),)
+    if value.tzinfo is None:
+        return (value,)
+    return (value.astimezone(datetime.timezone.utc).replace(tzinfo=None), value.replace(tzinfo=None))
+
+
+def _time_span_contains_event(span_start, span_end, event_start, event_end):
+    """Whether an event overlaps a time span (starts inclusive, ends exclusive)."""
+    span_start, span_end, event_start, event_end = _make_comparable(
+        (span_start, span_end, event_start, event_end)
+    )
+    if event_start == event_end:
+        if span_start == span_end:
+            return event_start == span_start
+        return span_start <= event_start < span_end
+    if span_start == span_end:
+        return event_start <= span_start < event_end
+    return event_start < span_end and span_start < event_end
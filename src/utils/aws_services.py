@@ -1,4 +1,4 @@
-"""AWS service utilities for parameter store access."""
+"""AWS service utilities for parameter store and S3 access."""
 import os
 import boto3
 
@@ -29,3 +29,24 @@ def get_ssm_parameter(name, region='eu-west-1'):
         WithDecryption=True
     )
     return parameter['Parameter']['Value']
+
+
+def upload_file_to_s3(path, bucket, key, region='eu-west-1'):
+    """
+    Upload a local file to S3.
+    
+    Args:
+        path (str): Local file path
+        bucket (str): Target bucket name
+        key (str): Target object key
+        region (str): AWS region (default: eu-west-1)
+    """
+    # Use AWS_PROFILE if set for local development
+    aws_profile = os.getenv('AWS_PROFILE')
+    if aws_profile:
+        session = boto3.Session(profile_name=aws_profile, region_name=region)
+        s3_client = session.client('s3')
+    else:
+        s3_client = boto3.client('s3', region_name=region)
+    
+    s3_client.upload_file(path, bucket, key)
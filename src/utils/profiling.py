@@ -0,0 +1,242 @@
+"""Profiling utilities for capturing where an invocation spends CPU time and memory."""
+import os
+import sys
+import time
+import pstats
+import random
+import cProfile
+import datetime
+import functools
+import threading
+import tracemalloc
+from collections import Counter
+
+from utils.aws_services import upload_file_to_s3
+
+# Files written for each profiled invocation
+PROFILE_EXTENSIONS = ('.pstats', '.collapsed', '.txt')
+
+
+def should_profile():
+    """
+    Decide whether the current invocation is profiled.
+
+    Configuration (environment variables):
+        PROFILE_INVOCATIONS: "true" to profile every invocation
+        PROFILE_SAMPLE_RATE: Fraction of invocations to profile, e.g. "0.05"
+
+    Returns:
+        bool: True if the invocation should be profiled
+    """
+    if os.getenv('PROFILE_INVOCATIONS', 'false').lower() == 'true':
+        return True
+    try:
+        sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    except ValueError:
+        # A typo in the configuration must not fail every invocation
+        print(f"Error: PROFILE_SAMPLE_RATE {os.getenv('PROFILE_SAMPLE_RATE')!r} is not a number, profiling disabled")
+        return False
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def profile_invocation(handler):
+    """
+    Decorate a Lambda handler to profile sampled invocations.
+
+    Profiled invocations run under cProfile and tracemalloc while a
+    background thread samples the handler's call stack. The results are
+    written to PROFILE_OUTPUT_DIR (default: /tmp/profiles):
+    - <name>.pstats: cProfile statistics, open with pstats or snakeviz
+    - <name>.collapsed: Sampled stacks in collapsed format for flame graphs
+    - <name>.txt: Summary of hot functions, top allocations and peak memory
+    If PROFILE_S3_BUCKET is set, the files are uploaded there and removed
+    locally. Only the newest PROFILE_KEEP_FILES (default: 10) profiles are
+    kept in the output directory, so /tmp doesn't fill up.
+
+    Args:
+        handler: Lambda handler function (event, context)
+
+    Returns:
+        function: Wrapped handler
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not should_profile():
+            return handler(event, context)
+
+        try:
+            interval = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000
+        except ValueError:
+            print('Error: PROFILE_SAMPLE_INTERVAL_MS is not a number, sampling every 5 ms')
+            interval = 0.005
+        sampler = StackSampler(threading.get_ident(), interval)
+        profiler = cProfile.Profile()
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            return handler(event, context)
+        finally:
+            profiler.disable()
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_memory = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            try:
+                write_profile(profiler, sampler.stacks, snapshot, peak_memory, elapsed, context)
+            except Exception as e:
+                # Never fail the invocation because the profile could not be saved
+                print(f'Error writing profile: {str(e)}')
+
+    return wrapper
+
+
+class StackSampler:
+    """Periodically record the call stack of one thread in collapsed form."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+
+def write_profile(profiler, stacks, snapshot, peak_memory, elapsed, context):
+    """
+    Write the profile files of an invocation and print its summary.
+
+    Args:
+        profiler (cProfile.Profile): Profiler that ran the invocation
+        stacks (Counter): Sampled collapsed stacks and their counts
+        snapshot (tracemalloc.Snapshot): Allocations at the end of the invocation
+        peak_memory (int): Peak traced memory in bytes
+        elapsed (float): Wall time of the invocation in seconds
+        context: Lambda context object (its request ID names the files)
+
+    Returns:
+        list: Paths of the written files (removed again once uploaded to S3)
+    """
+    output_dir = os.getenv('PROFILE_OUTPUT_DIR', '/tmp/profiles')
+    top_n = int(os.getenv('PROFILE_TOP_N', '15'))
+    os.makedirs(output_dir, exist_ok=True)
+
+    request_id = getattr(context, 'aws_request_id', None)
+    name = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{request_id or os.getpid()}"
+    base_path = os.path.join(output_dir, name)
+
+    profiler.dump_stats(f'{base_path}.pstats')
+
+    with open(f'{base_path}.collapsed', 'w') as collapsed_file:
+        for stack, count in stacks.most_common():
+            collapsed_file.write(f'{stack} {count}\n')
+
+    summary = format_profile_summary(profiler, snapshot, peak_memory, elapsed, top_n)
+    with open(f'{base_path}.txt', 'w') as summary_file:
+        summary_file.write(summary)
+    print(summary)
+
+    paths = [f'{base_path}{extension}' for extension in PROFILE_EXTENSIONS]
+    bucket = os.getenv('PROFILE_S3_BUCKET')
+    if bucket:
+        prefix = os.getenv('PROFILE_S3_PREFIX', 'profiles/')
+        for path in paths:
+            upload_file_to_s3(path, bucket, f'{prefix}{os.path.basename(path)}')
+        print(f'Uploaded profile {name} to s3://{bucket}/{prefix}')
+        for path in paths:
+            os.remove(path)
+    prune_profiles(output_dir, int(os.getenv('PROFILE_KEEP_FILES', '10')))
+    return paths
+
+
+def prune_profiles(output_dir, keep):
+    """
+    Remove all but the newest profiles from the output directory.
+
+    Profiles that were never uploaded, or whose upload failed, would otherwise
+    pile up in /tmp of a warm Lambda container.
+
+    Args:
+        output_dir (str): Directory the profile files are written to
+        keep (int): Number of profiles (sets of files) to keep
+    """
+    profiles = {}
+    for filename in os.listdir(output_dir):
+        name, extension = os.path.splitext(filename)
+        if extension in PROFILE_EXTENSIONS:
+            path = os.path.join(output_dir, filename)
+            profiles[name] = max(profiles.get(name, 0), os.path.getmtime(path))
+
+    for name in sorted(profiles, key=profiles.get, reverse=True)[max(keep, 0):]:
+        for extension in PROFILE_EXTENSIONS:
+            path = os.path.join(output_dir, f'{name}{extension}')
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def format_profile_summary(profiler, snapshot, peak_memory, elapsed, top_n=15):
+    """
+    Summarize the hot functions and top allocations of a profiled invocation.
+
+    Args:
+        profiler (cProfile.Profile): Profiler that ran the invocation
+        snapshot (tracemalloc.Snapshot): Allocations at the end of the invocation
+        peak_memory (int): Peak traced memory in bytes
+        elapsed (float): Wall time of the invocation in seconds
+        top_n (int): Number of functions and allocation sites listed
+
+    Returns:
+        str: Human readable summary
+    """
+    stats = pstats.Stats(profiler)
+    # stats entries: (cc, nc, tottime, cumtime, callers) keyed by (file, line, function)
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+
+    lines = [
+        f'Profile summary: {elapsed * 1000:.1f} ms wall time, '
+        f'{stats.total_tt * 1000:.1f} ms profiled, peak memory {peak_memory / 1024 / 1024:.1f} MiB',
+        f'Top {top_n} functions by own time (ms own / ms cumulative / calls):'
+    ]
+    for (filename, line, function), (_, calls, own_time, cumulative_time, _) in functions:
+        location = f'{os.path.basename(filename)}:{line}' if line else filename
+        lines.append(
+            f'  {own_time * 1000:9.1f} {cumulative_time * 1000:9.1f} {calls:8d}  {function} ({location})'
+        )
+
+    lines.append(f'Top {top_n} allocation sites still held (KiB / blocks):')
+    # Leave out the profiler's own bookkeeping
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ])
+    for statistic in snapshot.statistics('lineno')[:top_n]:
+        frame = statistic.traceback[0]
+        lines.append(
+            f'  {statistic.size / 1024:9.1f} {statistic.count:8d}  '
+            f'{os.path.basename(frame.filename)}:{frame.lineno}'
+        )
+    return '\n'.join(lines) + '\n'